@@ -1,3 +1,21 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import GeocodingJob
+
+
+@admin.register(GeocodingJob)
+class GeocodingJobAdmin(admin.ModelAdmin):
+    list_display = [
+        'address',
+        'status',
+        'attempts',
+        'next_attempt_at',
+        'created_at',
+        'updated_at',
+    ]
+    list_filter = [
+        'status',
+    ]
+    search_fields = [
+        'address',
+    ]
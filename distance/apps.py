@@ -2,4 +2,8 @@ from django.apps import AppConfig
 
 
 class DistanceConfig(AppConfig):
+    default_auto_field = 'django.db.models.AutoField'
     name = 'distance'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,116 @@
+import hashlib
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class LRUCache:
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = Lock()
+
+    def get_many(self, keys):
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            for key in keys:
+                item = self._items.get(key)
+                if item is None or item[1] < now:
+                    self._items.pop(key, None)
+                    self.misses += 1
+                    continue
+                self._items.move_to_end(key)
+                found[key] = item[0]
+                self.hits += 1
+        return found
+
+    def set_many(self, values):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, value in values.items():
+                self._items[key] = (value, expires_at)
+                self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._items),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+
+class CoordsCache:
+    def __init__(self):
+        self.local = LRUCache(settings.COORDS_LRU_SIZE, settings.COORDS_LRU_TTL)
+        self.shared_hits = 0
+        self.shared_misses = 0
+
+    @staticmethod
+    def make_key(key):
+        return 'coords:' + hashlib.sha1(key.encode()).hexdigest()
+
+    @property
+    def shared(self):
+        if not settings.COORDS_CACHE_ALIAS:
+            return None
+        return caches[settings.COORDS_CACHE_ALIAS]
+
+    def get_many(self, keys):
+        found = self.local.get_many(keys)
+        missing_keys = [key for key in keys if key not in found]
+        if not missing_keys or self.shared is None:
+            return found
+
+        shared_keys = {self.make_key(key): key for key in missing_keys}
+        shared_found = {
+            shared_keys[shared_key]: value
+            for shared_key, value in self.shared.get_many(list(shared_keys)).items()
+        }
+        self.shared_hits += len(shared_found)
+        self.shared_misses += len(missing_keys) - len(shared_found)
+        self.local.set_many(shared_found)
+        found.update(shared_found)
+        return found
+
+    def set_many(self, values):
+        self.local.set_many(values)
+        if self.shared is not None and values:
+            self.shared.set_many(
+                {self.make_key(key): value for key, value in values.items()},
+                timeout=settings.COORDS_CACHE_TTL,
+            )
+
+    def delete_many(self, keys):
+        self.local.delete_many(keys)
+        if self.shared is not None and keys:
+            self.shared.delete_many([self.make_key(key) for key in keys])
+
+    def stats(self):
+        return {
+            **self.local.stats(),
+            'shared_hits': self.shared_hits,
+            'shared_misses': self.shared_misses,
+        }
+
+
+coords_cache = CoordsCache()
@@ -0,0 +1,105 @@
+from collections import defaultdict
+
+import requests
+
+from django.conf import settings
+
+from foodcartapp.tracing import span
+
+from .cache import coords_cache
+from .geocoder import GetCoordsError, fetch_coordinates
+from .jobs import enqueue_geocoding
+from .models import PlaceCoords
+from .normalization import normalize_address
+
+
+REFRESH_SYNC = 'sync'
+REFRESH_BACKGROUND = 'background'
+REFRESH_NEVER = 'never'
+
+
+def resolve_many(addresses, geocode_missing=True):
+    with span('coords.resolve_many', geocode_missing=geocode_missing) as resolve_span:
+        coords = _resolve_many(addresses, geocode_missing, resolve_span)
+    return coords
+
+
+def _resolve_many(addresses, geocode_missing, resolve_span):
+    addresses_by_key = defaultdict(set)
+    for address in addresses:
+        if address:
+            addresses_by_key[normalize_address(address)].add(address)
+
+    coords_by_key = coords_cache.get_many(list(addresses_by_key))
+    uncached_keys = addresses_by_key.keys() - coords_by_key.keys()
+    resolve_span.set(addresses=len(addresses_by_key), cached=len(coords_by_key))
+    stale_keys = set()
+    if uncached_keys:
+        places = (
+            PlaceCoords.objects
+            .filter(normalized_address__in=uncached_keys)
+            .with_staleness()
+            .values_list('normalized_address', 'lon', 'lat', 'is_stale')
+        )
+        for normalized_address, lon, lat, is_stale in places:
+            coords_by_key[normalized_address] = (lon, lat)
+            if is_stale:
+                stale_keys.add(normalized_address)
+        resolve_span.set(from_db=len(coords_by_key) - resolve_span.attributes['cached'])
+        coords_cache.set_many({
+            key: coords_by_key[key]
+            for key in (uncached_keys & coords_by_key.keys()) - stale_keys
+        })
+
+    # без geocode_missing в геокодер не ходим и ради устаревших адресов:
+    # так вызывают из on_commit внутри запроса, где ждать сеть нельзя
+    refresh_in_background = (
+        settings.COORDS_REFRESH_POLICY == REFRESH_BACKGROUND
+        or settings.COORDS_REFRESH_POLICY == REFRESH_SYNC and not geocode_missing
+    )
+    if refresh_in_background:
+        enqueue_geocoding(
+            [min(addresses_by_key[key]) for key in stale_keys],
+            refresh=True,
+        )
+        # пока задача в очереди, старое значение отдаётся из кэша, иначе
+        # каждое чтение ставило бы адрес в очередь заново; обновлённые
+        # координаты PlaceCoords.objects.store() положит в кэш сам
+        coords_cache.set_many({key: coords_by_key[key] for key in stale_keys})
+        stale_keys = set()
+    elif settings.COORDS_REFRESH_POLICY == REFRESH_NEVER:
+        stale_keys = set()
+
+    missing_keys = addresses_by_key.keys() - coords_by_key.keys()
+    if not geocode_missing:
+        enqueue_geocoding([min(addresses_by_key[key]) for key in missing_keys])
+        for key in missing_keys:
+            coords_by_key[key] = (None, None)
+        missing_keys = set()
+
+    geocoded = {}
+    resolve_span.set(geocoded=len(missing_keys | stale_keys))
+    for key in missing_keys | stale_keys:
+        address = min(addresses_by_key[key])
+        try:
+            lon, lat = fetch_coordinates(address)
+            geocoded[address] = coords_by_key[key] = (float(lon), float(lat))
+        except GetCoordsError:
+            # у устаревшего адреса остаются прежние координаты
+            if key not in stale_keys:
+                coords_by_key[key] = (None, None)
+            geocoded[address] = coords_by_key[key]
+        except requests.RequestException:
+            coords_by_key.setdefault(key, (None, None))
+    PlaceCoords.objects.store(geocoded)
+
+    return {
+        address: coords_by_key[key]
+        for key, addresses in addresses_by_key.items()
+        for address in addresses
+    }
+
+
+def get_coords(place_address):
+    with span('coords.get_coords'):
+        return resolve_many([place_address]).get(place_address, (None, None))
@@ -0,0 +1,205 @@
+import random
+import time
+from threading import Lock
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from django.conf import settings
+
+from foodcartapp import metrics
+from foodcartapp.tracing import span
+
+
+class GetCoordsError(TypeError):
+    pass
+
+
+class GeocoderUnavailable(requests.RequestException):
+    pass
+
+
+class GeocoderResponseError(requests.RequestException):
+    pass
+
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class YandexGeocoder:
+    def __init__(
+        self,
+        apikey,
+        base_url,
+        connect_timeout=3.05,
+        read_timeout=10,
+        retries=2,
+        backoff=0.5,
+        max_backoff=5,
+        breaker_threshold=5,
+        breaker_cooldown=30,
+        pool_size=10,
+    ):
+        self.apikey = apikey
+        self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._lock = Lock()
+        self._consecutive_failures = 0
+        self._open_until = 0
+        self._half_open_probe = False
+        self.counters = {
+            'requests': 0,
+            'errors': 0,
+            'retries': 0,
+            'not_found': 0,
+            'short_circuited': 0,
+            'latency_seconds_total': 0.0,
+            'latency_seconds_max': 0.0,
+        }
+
+    def _increment(self, name, value=1):
+        with self._lock:
+            self.counters[name] += value
+
+    def _allow_request(self):
+        """Вернуть пару (можно ли идти в геокодер, пробный ли это запрос)."""
+        with self._lock:
+            if self._consecutive_failures < self.breaker_threshold:
+                return True, False
+            if time.monotonic() < self._open_until or self._half_open_probe:
+                self.counters['short_circuited'] += 1
+                return False, False
+            self._half_open_probe = True
+            return True, True
+
+    def _release_probe(self):
+        with self._lock:
+            self._half_open_probe = False
+
+    def _record_success(self):
+        with self._lock:
+            self._consecutive_failures = 0
+            self._half_open_probe = False
+
+    def _record_failure(self):
+        with self._lock:
+            self._consecutive_failures += 1
+            self._half_open_probe = False
+            if self._consecutive_failures >= self.breaker_threshold:
+                self._open_until = time.monotonic() + self.breaker_cooldown
+
+    def _sleep_before_retry(self, attempt):
+        self._increment('retries')
+        time.sleep(random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt)))
+
+    def _request(self, address):
+        started_at = time.monotonic()
+        try:
+            response = self.session.get(self.base_url, params={
+                "geocode": address,
+                "apikey": self.apikey,
+                "format": "json",
+            }, timeout=self.timeout)
+        finally:
+            latency = time.monotonic() - started_at
+            with self._lock:
+                self.counters['requests'] += 1
+                self.counters['latency_seconds_total'] += latency
+                self.counters['latency_seconds_max'] = max(self.counters['latency_seconds_max'], latency)
+            metrics.registry.observe('geocoder_request_duration_seconds', latency)
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _parse_coordinates(response):
+        try:
+            found_places = response.json()['response']['GeoObjectCollection']['featureMember']
+            if not found_places:
+                return None
+            lon, lat = found_places[0]['GeoObject']['Point']['pos'].split(' ')
+            return float(lon), float(lat)
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as error:
+            raise GeocoderResponseError('Некорректный ответ геокодера') from error
+
+    def fetch_coordinates(self, address):
+        # сам адрес в трассу не пишем: это персональные данные клиента
+        with span('geocoder.fetch_coordinates') as geocoder_span:
+            allowed, is_probe = self._allow_request()
+            if not allowed:
+                geocoder_span.set(short_circuited=True)
+                raise GeocoderUnavailable('Геокодер недоступен, повторите позже')
+            try:
+                coords = self._fetch_with_retries(address, geocoder_span)
+            finally:
+                if is_probe:
+                    self._release_probe()
+
+            geocoder_span.set(found=coords is not None)
+            if coords is None:
+                self._increment('not_found')
+                raise GetCoordsError('Некорректный адрес')
+        return coords
+
+    def _fetch_with_retries(self, address, geocoder_span):
+        for attempt in range(self.retries + 1):
+            geocoder_span.set(attempts=attempt + 1)
+            try:
+                coords = self._parse_coordinates(self._request(address))
+            except requests.RequestException as error:
+                self._increment('errors')
+                retriable = (
+                    not isinstance(error, requests.HTTPError)
+                    or error.response.status_code in RETRY_STATUSES
+                )
+                if not retriable:
+                    # 4xx говорит о запросе, а не о здоровье геокодера:
+                    # состояние предохранителя не меняем
+                    raise
+                if attempt == self.retries:
+                    self._record_failure()
+                    raise
+                self._sleep_before_retry(attempt)
+            else:
+                self._record_success()
+                return coords
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+
+_geocoder = None
+_geocoder_lock = Lock()
+
+
+def get_geocoder():
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                _geocoder = YandexGeocoder(
+                    settings.YANDEX_APIKEY,
+                    settings.YANDEX_GEOCODER_URL,
+                    connect_timeout=settings.GEOCODER_CONNECT_TIMEOUT,
+                    read_timeout=settings.GEOCODER_READ_TIMEOUT,
+                    retries=settings.GEOCODER_RETRIES,
+                    breaker_threshold=settings.GEOCODER_BREAKER_THRESHOLD,
+                    breaker_cooldown=settings.GEOCODER_BREAKER_COOLDOWN,
+                    pool_size=max(10, settings.GEOCODER_WORKER_THREADS),
+                )
+    return _geocoder
+
+
+def fetch_coordinates(address):
+    return get_geocoder().fetch_coordinates(address)
@@ -0,0 +1,148 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import requests
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .geocoder import GeocoderUnavailable, GetCoordsError, fetch_coordinates
+from .models import GeocodingJob, PlaceCoords
+from .normalization import normalize_address
+
+
+def enqueue_geocoding(addresses, refresh=False):
+    addresses = {
+        normalize_address(address): address
+        for address in addresses if address
+    }
+    if not addresses:
+        return
+    if not refresh:
+        known_keys = (
+            PlaceCoords.objects
+            .filter(normalized_address__in=addresses)
+            .values_list('normalized_address', flat=True)
+        )
+        for key in known_keys:
+            del addresses[key]
+    # без refresh сюда доходят только адреса без PlaceCoords: их прошлая задача,
+    # если была, сдалась на сетевых ошибках, и адрес стоит попробовать снова
+    now = timezone.now()
+    GeocodingJob.objects.filter(normalized_address__in=addresses).exclude(
+        status__in=[GeocodingJob.PENDING, GeocodingJob.PROCESSING],
+    ).update(status=GeocodingJob.PENDING, attempts=0, next_attempt_at=now, updated_at=now)
+    GeocodingJob.objects.bulk_create(
+        [
+            GeocodingJob(address=address, normalized_address=normalized_address)
+            for normalized_address, address in addresses.items()
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def claim_jobs(batch_size, stale_after=timedelta(minutes=10)):
+    now = timezone.now()
+    stale_since = now - stale_after
+    with transaction.atomic():
+        job_ids = list(
+            GeocodingJob.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                Q(status=GeocodingJob.PENDING, next_attempt_at__lte=now)
+                | Q(status=GeocodingJob.PROCESSING, updated_at__lt=stale_since)
+            )
+            .order_by('created_at', 'id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        GeocodingJob.objects.filter(id__in=job_ids).update(
+            status=GeocodingJob.PROCESSING,
+            attempts=F('attempts') + 1,
+            updated_at=now,
+        )
+    return list(GeocodingJob.objects.filter(id__in=job_ids))
+
+
+def _geocode(address):
+    try:
+        return fetch_coordinates(address), None
+    except (GetCoordsError, requests.RequestException) as error:
+        return None, error
+
+
+def _keep_known_coords(addresses):
+    """Вернуть прежние координаты ненайденных адресов, если они были.
+
+    Геокодер иногда перестаёт находить адрес, который находил раньше, —
+    затирать ради этого известные координаты незачем.
+    """
+    addresses = {normalize_address(address): address for address in addresses}
+    known_coords = {
+        normalized_address: (lon, lat)
+        for normalized_address, lon, lat in (
+            PlaceCoords.objects
+            .filter(normalized_address__in=addresses, lon__isnull=False)
+            .values_list('normalized_address', 'lon', 'lat')
+        )
+    }
+    return {
+        address: known_coords.get(normalized_address, (None, None))
+        for normalized_address, address in addresses.items()
+    }
+
+
+def _describe_error(error):
+    if isinstance(error, requests.HTTPError):
+        return f'HTTP {error.response.status_code}'
+    if isinstance(error, requests.RequestException):
+        return error.__class__.__name__
+    return str(error)
+
+
+def _retry_delay(attempts):
+    delay = settings.GEOCODER_JOB_BACKOFF * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, settings.GEOCODER_JOB_MAX_BACKOFF))
+
+
+def process_jobs(jobs, threads=1):
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(_geocode, [job.address for job in jobs]))
+
+    now = timezone.now()
+    geocoded = {}
+    not_found = []
+    for job, (coords, error) in zip(jobs, results):
+        if coords:
+            lon, lat = coords
+            geocoded[job.address] = (float(lon), float(lat))
+            job.status = GeocodingJob.DONE
+            job.last_error = ''
+        elif isinstance(error, GetCoordsError):
+            not_found.append(job.address)
+            job.status = GeocodingJob.FAILED
+            job.last_error = _describe_error(error)
+        elif isinstance(error, GeocoderUnavailable):
+            # в геокодер не ходили, пока открыт предохранитель, — попыткой это не считаем
+            job.status = GeocodingJob.PENDING
+            job.attempts -= 1
+            job.next_attempt_at = now + timedelta(seconds=settings.GEOCODER_BREAKER_COOLDOWN)
+            job.last_error = _describe_error(error)
+        elif job.attempts >= settings.GEOCODER_MAX_ATTEMPTS:
+            job.status = GeocodingJob.FAILED
+            job.last_error = _describe_error(error)
+        else:
+            job.status = GeocodingJob.PENDING
+            job.next_attempt_at = now + _retry_delay(job.attempts)
+            job.last_error = _describe_error(error)
+        job.updated_at = now
+
+    geocoded.update(_keep_known_coords(not_found))
+    with transaction.atomic():
+        PlaceCoords.objects.store(geocoded)
+        GeocodingJob.objects.bulk_update(
+            jobs,
+            ['status', 'attempts', 'next_attempt_at', 'last_error', 'updated_at'],
+        )
+    return jobs
@@ -0,0 +1,51 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from distance.jobs import claim_jobs, process_jobs
+from distance.models import GeocodingJob
+from distance.order_distances import update_distances_for_addresses
+from foodcartapp import metrics
+
+
+class Command(BaseCommand):
+    help = 'Геокодирует адреса из очереди GeocodingJob и сохраняет координаты в PlaceCoords'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads',
+            type=int,
+            default=settings.GEOCODER_WORKER_THREADS,
+            help='Сколько запросов к геокодеру выполнять одновременно',
+        )
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5,
+            help='Пауза в секундах, если очередь пуста',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Разобрать очередь и завершиться',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            jobs = claim_jobs(options['batch_size'])
+            if not jobs:
+                metrics.registry.flush(force=True)
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+
+            process_jobs(jobs, threads=options['threads'])
+            update_distances_for_addresses(
+                job.address for job in jobs if job.status != GeocodingJob.PENDING
+            )
+            done = sum(job.status == GeocodingJob.DONE for job in jobs)
+            self.stdout.write(f'Обработано адресов: {len(jobs)}, найдено: {done}')
+            metrics.registry.flush()
@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from distance.jobs import claim_jobs, enqueue_geocoding, process_jobs
+from distance.models import GeocodingJob, PlaceCoords
+from distance.order_distances import update_distances_for_addresses
+
+
+class Command(BaseCommand):
+    help = 'Заново геокодирует адреса, координаты которых получены давно'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than',
+            type=int,
+            required=True,
+            help='Обновить координаты, полученные больше стольких дней назад',
+        )
+        parser.add_argument(
+            '--not-found-only',
+            action='store_true',
+            help='Обновить только адреса, которые геокодер не нашёл',
+        )
+        parser.add_argument(
+            '--enqueue-only',
+            action='store_true',
+            help='Только поставить адреса в очередь geocode_worker',
+        )
+        parser.add_argument('--threads', type=int, default=settings.GEOCODER_WORKER_THREADS)
+        parser.add_argument('--batch-size', type=int, default=50)
+
+    def handle(self, *args, **options):
+        places = PlaceCoords.objects.filter(
+            date_of_calculate_coords__lt=timezone.now() - timedelta(days=options['older_than']),
+        )
+        if options['not_found_only']:
+            places = places.filter(lon__isnull=True)
+        addresses = list(places.values_list('address', flat=True))
+        enqueue_geocoding(addresses, refresh=True)
+        self.stdout.write(f'Поставлено в очередь адресов: {len(addresses)}')
+        if options['enqueue_only']:
+            return
+
+        while True:
+            jobs = claim_jobs(options['batch_size'])
+            if not jobs:
+                return
+            process_jobs(jobs, threads=options['threads'])
+            update_distances_for_addresses(
+                job.address for job in jobs if job.status != GeocodingJob.PENDING
+            )
+            self.stdout.write(f'Обработано адресов: {len(jobs)}')
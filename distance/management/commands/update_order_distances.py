@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from distance.order_distances import update_order_distances
+from foodcartapp.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сохранённые расстояния от заказов до ресторанов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересчитать для всех заказов, а не только для необработанных',
+        )
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        orders = Order.objects.order_by('id')
+        if not options['all']:
+            orders = orders.filter(status=Order.OPEN)
+        order_ids = list(orders.values_list('id', flat=True))
+
+        batch_size = options['batch_size']
+        for start in range(0, len(order_ids), batch_size):
+            update_order_distances(order_ids[start:start + batch_size])
+        self.stdout.write(f'Пересчитано заказов: {len(order_ids)}')
@@ -0,0 +1,35 @@
+# Generated by Django 3.2 on 2026-10-18 17:09
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distance', '0005_alter_placecoords_date_of_calculate_coords'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodingJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(max_length=200, unique=True, verbose_name='Адрес места')),
+                ('status', models.CharField(choices=[('PENDING', 'В очереди'), ('PROCESSING', 'В работе'), ('DONE', 'Готово'), ('FAILED', 'Ошибка')], db_index=True, default='PENDING', max_length=20, verbose_name='Статус')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Число попыток')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Дата постановки в очередь')),
+                ('updated_at', models.DateTimeField(auto_now=True, db_index=True, verbose_name='Дата изменения')),
+            ],
+            options={
+                'verbose_name': 'Задача геокодирования',
+                'verbose_name_plural': 'Задачи геокодирования',
+            },
+        ),
+        migrations.AlterField(
+            model_name='placecoords',
+            name='address',
+            field=models.CharField(max_length=200, unique=True, verbose_name='Адрес места'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.2 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distance', '0006_auto_20261018_1709'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='placecoords',
+            name='normalized_address',
+            field=models.CharField(max_length=300, null=True, verbose_name='Нормализованный адрес'),
+        ),
+    ]
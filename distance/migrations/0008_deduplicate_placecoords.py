@@ -0,0 +1,77 @@
+import re
+
+from django.db import migrations
+
+
+NORMALIZED_ADDRESS_MAX_LENGTH = 300
+
+# копия distance.normalization на момент этой миграции: нормализатор
+# может поменяться, а повторный прогон миграций должен дать прежние ключи
+ABBREVIATIONS = {
+    'г': 'город',
+    'гор': 'город',
+    'обл': 'область',
+    'р-н': 'район',
+    'мкр': 'микрорайон',
+    'мкрн': 'микрорайон',
+    'ул': 'улица',
+    'пр': 'проспект',
+    'пр-т': 'проспект',
+    'просп': 'проспект',
+    'пр-д': 'проезд',
+    'пер': 'переулок',
+    'пл': 'площадь',
+    'б-р': 'бульвар',
+    'бул': 'бульвар',
+    'бульв': 'бульвар',
+    'ш': 'шоссе',
+    'наб': 'набережная',
+    'туп': 'тупик',
+    'д': 'дом',
+    'к': 'корпус',
+    'корп': 'корпус',
+    'стр': 'строение',
+    'кв': 'квартира',
+}
+
+SEPARATORS_RE = re.compile(r'[^\w\s/-]+|(?<!\w)-|-(?!\w)')
+SPACES_RE = re.compile(r'\s+')
+
+
+def normalize_address(address):
+    address = address.casefold().replace('ё', 'е')
+    address = SEPARATORS_RE.sub(' ', address)
+    tokens = [ABBREVIATIONS.get(token, token) for token in SPACES_RE.split(address) if token]
+    return ' '.join(tokens)[:NORMALIZED_ADDRESS_MAX_LENGTH]
+
+
+def deduplicate_place_coords(apps, schema_editor):
+    PlaceCoords = apps.get_model('distance', 'PlaceCoords')
+
+    kept_places = {}
+    duplicate_ids = []
+    places = PlaceCoords.objects.order_by('-date_of_calculate_coords', '-id')
+    for place in places.iterator():
+        place.normalized_address = normalize_address(place.address)
+        kept_place = kept_places.get(place.normalized_address)
+        if kept_place is None:
+            kept_places[place.normalized_address] = place
+        elif kept_place.lon is None and place.lon is not None:
+            kept_places[place.normalized_address] = place
+            duplicate_ids.append(kept_place.id)
+        else:
+            duplicate_ids.append(place.id)
+
+    PlaceCoords.objects.filter(id__in=duplicate_ids).delete()
+    PlaceCoords.objects.bulk_update(kept_places.values(), ['normalized_address'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distance', '0007_placecoords_normalized_address'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_place_coords, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2 on 2026-10-18 17:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0061_alter_orderitem_quantity'),
+        ('distance', '0009_alter_placecoords_normalized_address'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderRestaurantDistance',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('distance', models.FloatField(blank=True, db_index=True, null=True, verbose_name='Расстояние, км')),
+                ('calculated_at', models.DateTimeField(auto_now=True, verbose_name='Дата расчёта')),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='restaurant_distances', to='foodcartapp.order', verbose_name='Заказ')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_distances', to='foodcartapp.restaurant', verbose_name='Ресторан')),
+            ],
+            options={
+                'verbose_name': 'Расстояние от заказа до ресторана',
+                'verbose_name_plural': 'Расстояния от заказов до ресторанов',
+                'unique_together': {('order', 'restaurant')},
+            },
+        ),
+    ]
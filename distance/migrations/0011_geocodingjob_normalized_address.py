@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distance', '0010_orderrestaurantdistance'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='geocodingjob',
+            name='normalized_address',
+            field=models.CharField(max_length=300, null=True, verbose_name='Нормализованный адрес'),
+        ),
+    ]
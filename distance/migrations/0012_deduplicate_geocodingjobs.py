@@ -0,0 +1,72 @@
+import re
+
+from django.db import migrations
+
+
+NORMALIZED_ADDRESS_MAX_LENGTH = 300
+
+# копия distance.normalization на момент этой миграции: нормализатор
+# может поменяться, а повторный прогон миграций должен дать прежние ключи
+ABBREVIATIONS = {
+    'г': 'город',
+    'гор': 'город',
+    'обл': 'область',
+    'р-н': 'район',
+    'мкр': 'микрорайон',
+    'мкрн': 'микрорайон',
+    'ул': 'улица',
+    'пр': 'проспект',
+    'пр-т': 'проспект',
+    'просп': 'проспект',
+    'пр-д': 'проезд',
+    'пер': 'переулок',
+    'пл': 'площадь',
+    'б-р': 'бульвар',
+    'бул': 'бульвар',
+    'бульв': 'бульвар',
+    'ш': 'шоссе',
+    'наб': 'набережная',
+    'туп': 'тупик',
+    'д': 'дом',
+    'к': 'корпус',
+    'корп': 'корпус',
+    'стр': 'строение',
+    'кв': 'квартира',
+}
+
+SEPARATORS_RE = re.compile(r'[^\w\s/-]+|(?<!\w)-|-(?!\w)')
+SPACES_RE = re.compile(r'\s+')
+
+
+def normalize_address(address):
+    address = address.casefold().replace('ё', 'е')
+    address = SEPARATORS_RE.sub(' ', address)
+    tokens = [ABBREVIATIONS.get(token, token) for token in SPACES_RE.split(address) if token]
+    return ' '.join(tokens)[:NORMALIZED_ADDRESS_MAX_LENGTH]
+
+
+def deduplicate_geocoding_jobs(apps, schema_editor):
+    GeocodingJob = apps.get_model('distance', 'GeocodingJob')
+
+    kept_jobs = {}
+    duplicate_ids = []
+    for job in GeocodingJob.objects.order_by('-updated_at', '-id').iterator():
+        job.normalized_address = normalize_address(job.address)
+        if job.normalized_address in kept_jobs:
+            duplicate_ids.append(job.id)
+        else:
+            kept_jobs[job.normalized_address] = job
+
+    GeocodingJob.objects.filter(id__in=duplicate_ids).delete()
+    GeocodingJob.objects.bulk_update(kept_jobs.values(), ['normalized_address'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distance', '0011_geocodingjob_normalized_address'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_geocoding_jobs, migrations.RunPython.noop),
+    ]
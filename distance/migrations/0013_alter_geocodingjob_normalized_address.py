@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distance', '0012_deduplicate_geocodingjobs'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='geocodingjob',
+            name='normalized_address',
+            field=models.CharField(max_length=300, unique=True, verbose_name='Нормализованный адрес'),
+        ),
+    ]
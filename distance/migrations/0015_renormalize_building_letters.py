@@ -0,0 +1,122 @@
+import re
+
+from django.db import migrations
+
+
+NORMALIZED_ADDRESS_MAX_LENGTH = 300
+
+# копия distance.normalization на момент этой миграции: нормализатор
+# может поменяться, а повторный прогон миграций должен дать прежние ключи
+ABBREVIATIONS = {
+    'гор': 'город',
+    'обл': 'область',
+    'р-н': 'район',
+    'мкр': 'микрорайон',
+    'мкрн': 'микрорайон',
+    'ул': 'улица',
+    'пр': 'проспект',
+    'пр-т': 'проспект',
+    'просп': 'проспект',
+    'пр-д': 'проезд',
+    'пер': 'переулок',
+    'пл': 'площадь',
+    'б-р': 'бульвар',
+    'бул': 'бульвар',
+    'бульв': 'бульвар',
+    'ш': 'шоссе',
+    'наб': 'набережная',
+    'туп': 'тупик',
+    'корп': 'корпус',
+    'стр': 'строение',
+    'кв': 'квартира',
+}
+
+# однобуквенные сокращения совпадают с литерами домов («5 г», «12 д»),
+# поэтому раскрываются только перед тем, что обычно сокращают
+BEFORE_NUMBER_ABBREVIATIONS = {
+    'д': 'дом',
+    'к': 'корпус',
+}
+BEFORE_NAME_ABBREVIATIONS = {
+    'г': 'город',
+}
+ADDRESS_WORDS = {
+    *ABBREVIATIONS, *ABBREVIATIONS.values(),
+    *BEFORE_NUMBER_ABBREVIATIONS, *BEFORE_NUMBER_ABBREVIATIONS.values(),
+    *BEFORE_NAME_ABBREVIATIONS, *BEFORE_NAME_ABBREVIATIONS.values(),
+}
+
+SEPARATORS_RE = re.compile(r'[^\w\s/-]+|(?<!\w)-|-(?!\w)')
+SPACES_RE = re.compile(r'\s+')
+
+
+def expand_abbreviation(token, next_token):
+    if token in ABBREVIATIONS:
+        return ABBREVIATIONS[token]
+    if not next_token:
+        return token
+    if token in BEFORE_NUMBER_ABBREVIATIONS and next_token[0].isdigit():
+        return BEFORE_NUMBER_ABBREVIATIONS[token]
+    if token in BEFORE_NAME_ABBREVIATIONS and next_token[0].isalpha() and next_token not in ADDRESS_WORDS:
+        return BEFORE_NAME_ABBREVIATIONS[token]
+    return token
+
+
+def normalize_address(address):
+    address = address.casefold().replace('ё', 'е')
+    address = SEPARATORS_RE.sub(' ', address)
+    tokens = [token for token in SPACES_RE.split(address) if token]
+    tokens = [
+        expand_abbreviation(token, next_token)
+        for token, next_token in zip(tokens, [*tokens[1:], None])
+    ]
+    return ' '.join(tokens)[:NORMALIZED_ADDRESS_MAX_LENGTH]
+
+
+def renormalize_place_coords(apps, schema_editor):
+    PlaceCoords = apps.get_model('distance', 'PlaceCoords')
+
+    kept_places = {}
+    duplicate_ids = []
+    places = PlaceCoords.objects.order_by('-date_of_calculate_coords', '-id')
+    for place in places.iterator():
+        place.normalized_address = normalize_address(place.address)
+        kept_place = kept_places.get(place.normalized_address)
+        if kept_place is None:
+            kept_places[place.normalized_address] = place
+        elif kept_place.lon is None and place.lon is not None:
+            kept_places[place.normalized_address] = place
+            duplicate_ids.append(kept_place.id)
+        else:
+            duplicate_ids.append(place.id)
+
+    PlaceCoords.objects.filter(id__in=duplicate_ids).delete()
+    PlaceCoords.objects.bulk_update(kept_places.values(), ['normalized_address'], batch_size=500)
+
+
+def renormalize_geocoding_jobs(apps, schema_editor):
+    GeocodingJob = apps.get_model('distance', 'GeocodingJob')
+
+    kept_jobs = {}
+    duplicate_ids = []
+    for job in GeocodingJob.objects.order_by('-updated_at', '-id').iterator():
+        job.normalized_address = normalize_address(job.address)
+        if job.normalized_address in kept_jobs:
+            duplicate_ids.append(job.id)
+        else:
+            kept_jobs[job.normalized_address] = job
+
+    GeocodingJob.objects.filter(id__in=duplicate_ids).delete()
+    GeocodingJob.objects.bulk_update(kept_jobs.values(), ['normalized_address'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('distance', '0014_geocodingjob_next_attempt_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(renormalize_place_coords, migrations.RunPython.noop),
+        migrations.RunPython(renormalize_geocoding_jobs, migrations.RunPython.noop),
+    ]
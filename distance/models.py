@@ -1,13 +1,71 @@
-from django.db import models
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import BooleanField, ExpressionWrapper, Q
 from django.db.models.fields import FloatField
 from django.utils import timezone
 
+from .cache import coords_cache
+from .normalization import NORMALIZED_ADDRESS_MAX_LENGTH, normalize_address
+
+
+class PlaceCoordsQuerySet(models.QuerySet):
+    def with_staleness(self):
+        now = timezone.now()
+        is_stale = (
+            Q(lon__isnull=False, date_of_calculate_coords__lt=now - timedelta(days=settings.COORDS_TTL_DAYS))
+            | Q(lon__isnull=True, date_of_calculate_coords__lt=now - timedelta(days=settings.COORDS_NEGATIVE_TTL_DAYS))
+        )
+        return self.annotate(is_stale=ExpressionWrapper(is_stale, output_field=BooleanField()))
+
+    def stale(self):
+        return self.with_staleness().filter(is_stale=True)
+
+    def store(self, coords):
+        if not coords:
+            return
+        now = timezone.now()
+        normalized_coords = {
+            normalize_address(address): (address, lon, lat)
+            for address, (lon, lat) in coords.items()
+        }
+        places = self.in_bulk(list(normalized_coords), field_name='normalized_address')
+        for normalized_address, (address, lon, lat) in normalized_coords.items():
+            place = places.get(normalized_address) or PlaceCoords(
+                address=address,
+                normalized_address=normalized_address,
+            )
+            place.lon = lon
+            place.lat = lat
+            place.date_of_calculate_coords = now
+            places[normalized_address] = place
+
+        with transaction.atomic():
+            self.bulk_update(
+                [place for place in places.values() if place.pk],
+                ['lon', 'lat', 'date_of_calculate_coords'],
+            )
+            self.bulk_create(
+                [place for place in places.values() if not place.pk],
+                ignore_conflicts=True,
+            )
+        coords_cache.set_many({
+            normalized_address: (lon, lat)
+            for normalized_address, (address, lon, lat) in normalized_coords.items()
+        })
+
 
 class PlaceCoords(models.Model):
     address = models.CharField(
         'Адрес места',
         unique=True,
-        max_length=100,
+        max_length=200,
+    )
+    normalized_address = models.CharField(
+        'Нормализованный адрес',
+        unique=True,
+        max_length=NORMALIZED_ADDRESS_MAX_LENGTH,
     )
     date_of_calculate_coords = models.DateTimeField(
         'Дата получения координат места',
@@ -15,3 +73,98 @@ class PlaceCoords(models.Model):
         )
     lon = FloatField('Долгота', null=True, blank=True)
     lat = FloatField('Широта', null=True, blank=True)
+
+    objects = PlaceCoordsQuerySet.as_manager()
+
+    def __str__(self):
+        return self.address
+
+    def save(self, *args, **kwargs):
+        self.normalized_address = normalize_address(self.address)
+        super().save(*args, **kwargs)
+
+
+class GeocodingJob(models.Model):
+    PENDING = 'PENDING'
+    PROCESSING = 'PROCESSING'
+    DONE = 'DONE'
+    FAILED = 'FAILED'
+
+    STATUSES = [
+        (PENDING, 'В очереди'),
+        (PROCESSING, 'В работе'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    ]
+    address = models.CharField(
+        'Адрес места',
+        unique=True,
+        max_length=200,
+    )
+    normalized_address = models.CharField(
+        'Нормализованный адрес',
+        unique=True,
+        max_length=NORMALIZED_ADDRESS_MAX_LENGTH,
+    )
+    status = models.CharField(
+        'Статус',
+        max_length=20,
+        choices=STATUSES,
+        default=PENDING,
+        db_index=True,
+        )
+    attempts = models.PositiveIntegerField('Число попыток', default=0)
+    next_attempt_at = models.DateTimeField(
+        'Следующая попытка не раньше',
+        default=timezone.now,
+        db_index=True,
+        )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField(
+        'Дата постановки в очередь',
+        default=timezone.now,
+        db_index=True,
+        )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True,
+        )
+
+    class Meta:
+        verbose_name = 'Задача геокодирования'
+        verbose_name_plural = 'Задачи геокодирования'
+
+    def __str__(self):
+        return f'{self.address} ({self.get_status_display()})'
+
+    def save(self, *args, **kwargs):
+        self.normalized_address = normalize_address(self.address)
+        super().save(*args, **kwargs)
+
+
+class OrderRestaurantDistance(models.Model):
+    order = models.ForeignKey(
+        'foodcartapp.Order',
+        on_delete=models.CASCADE,
+        related_name='restaurant_distances',
+        verbose_name='Заказ',
+    )
+    restaurant = models.ForeignKey(
+        'foodcartapp.Restaurant',
+        on_delete=models.CASCADE,
+        related_name='order_distances',
+        verbose_name='Ресторан',
+    )
+    distance = FloatField('Расстояние, км', null=True, blank=True, db_index=True)
+    calculated_at = models.DateTimeField('Дата расчёта', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Расстояние от заказа до ресторана'
+        verbose_name_plural = 'Расстояния от заказов до ресторанов'
+        unique_together = [
+            ['order', 'restaurant']
+        ]
+
+    def __str__(self):
+        return f'{self.order} - {self.restaurant}: {self.distance}'
@@ -0,0 +1,69 @@
+import re
+
+
+NORMALIZED_ADDRESS_MAX_LENGTH = 300
+
+ABBREVIATIONS = {
+    'гор': 'город',
+    'обл': 'область',
+    'р-н': 'район',
+    'мкр': 'микрорайон',
+    'мкрн': 'микрорайон',
+    'ул': 'улица',
+    'пр': 'проспект',
+    'пр-т': 'проспект',
+    'просп': 'проспект',
+    'пр-д': 'проезд',
+    'пер': 'переулок',
+    'пл': 'площадь',
+    'б-р': 'бульвар',
+    'бул': 'бульвар',
+    'бульв': 'бульвар',
+    'ш': 'шоссе',
+    'наб': 'набережная',
+    'туп': 'тупик',
+    'корп': 'корпус',
+    'стр': 'строение',
+    'кв': 'квартира',
+}
+
+# однобуквенные сокращения совпадают с литерами домов («5 г», «12 д»),
+# поэтому раскрываются только перед тем, что обычно сокращают
+BEFORE_NUMBER_ABBREVIATIONS = {
+    'д': 'дом',
+    'к': 'корпус',
+}
+BEFORE_NAME_ABBREVIATIONS = {
+    'г': 'город',
+}
+ADDRESS_WORDS = {
+    *ABBREVIATIONS, *ABBREVIATIONS.values(),
+    *BEFORE_NUMBER_ABBREVIATIONS, *BEFORE_NUMBER_ABBREVIATIONS.values(),
+    *BEFORE_NAME_ABBREVIATIONS, *BEFORE_NAME_ABBREVIATIONS.values(),
+}
+
+SEPARATORS_RE = re.compile(r'[^\w\s/-]+|(?<!\w)-|-(?!\w)')
+SPACES_RE = re.compile(r'\s+')
+
+
+def expand_abbreviation(token, next_token):
+    if token in ABBREVIATIONS:
+        return ABBREVIATIONS[token]
+    if not next_token:
+        return token
+    if token in BEFORE_NUMBER_ABBREVIATIONS and next_token[0].isdigit():
+        return BEFORE_NUMBER_ABBREVIATIONS[token]
+    if token in BEFORE_NAME_ABBREVIATIONS and next_token[0].isalpha() and next_token not in ADDRESS_WORDS:
+        return BEFORE_NAME_ABBREVIATIONS[token]
+    return token
+
+
+def normalize_address(address):
+    address = address.casefold().replace('ё', 'е')
+    address = SEPARATORS_RE.sub(' ', address)
+    tokens = [token for token in SPACES_RE.split(address) if token]
+    tokens = [
+        expand_abbreviation(token, next_token)
+        for token, next_token in zip(tokens, [*tokens[1:], None])
+    ]
+    return ' '.join(tokens)[:NORMALIZED_ADDRESS_MAX_LENGTH]
@@ -0,0 +1,97 @@
+from django.db import transaction
+
+from foodcartapp.models import Order, Restaurant
+from foodcartapp.tracing import span
+
+from .coords import resolve_many
+from .matrix import pairwise_distances
+from .models import OrderRestaurantDistance
+from .normalization import normalize_address
+
+
+def _as_point(coords):
+    lon, lat = coords
+    if lon is None or lat is None:
+        return None
+    return lat, lon
+
+
+def update_order_distances(order_ids):
+    with span('distance.update_order_distances') as distances_span:
+        _update_order_distances(order_ids, distances_span)
+
+
+def _update_order_distances(order_ids, distances_span):
+    order_addresses = dict(
+        Order.objects
+        .filter(id__in=order_ids)
+        .values_list('id', 'address')
+    )
+    links = list(
+        Order.available_restaurants.through.objects
+        .filter(order_id__in=order_addresses)
+        .values_list('order_id', 'restaurant_id')
+    )
+    restaurant_addresses = dict(
+        Restaurant.objects
+        .filter(id__in={restaurant_id for _, restaurant_id in links})
+        .values_list('id', 'address')
+    )
+    coords = resolve_many(
+        [*order_addresses.values(), *restaurant_addresses.values()],
+        geocode_missing=False,
+    )
+
+    located_links = []
+    origins = []
+    destinations = []
+    for order_id, restaurant_id in links:
+        order_point = _as_point(coords.get(order_addresses[order_id], (None, None)))
+        restaurant_point = _as_point(coords.get(restaurant_addresses[restaurant_id], (None, None)))
+        if order_point and restaurant_point:
+            located_links.append((order_id, restaurant_id))
+            origins.append(order_point)
+            destinations.append(restaurant_point)
+    distances_span.set(orders=len(order_addresses), links=len(links), located_links=len(located_links))
+    with span('distance.pairwise_distances', pairs=len(origins), precise=True):
+        distances = dict(zip(located_links, pairwise_distances(origins, destinations, precise=True)))
+
+    with transaction.atomic():
+        OrderRestaurantDistance.objects.filter(order_id__in=order_addresses).delete()
+        OrderRestaurantDistance.objects.bulk_create([
+            OrderRestaurantDistance(
+                order_id=order_id,
+                restaurant_id=restaurant_id,
+                distance=distances.get((order_id, restaurant_id)),
+            )
+            for order_id, restaurant_id in links
+        ])
+
+
+def update_distances_for_addresses(addresses):
+    addresses = set(addresses)
+    normalized_addresses = {normalize_address(address) for address in addresses}
+    # задача геокодирования одна на все написания адреса, поэтому заказы
+    # с другим написанием ищутся среди тех, кому ещё не хватает расстояний
+    unlocated_orders = (
+        Order.objects
+        .filter(status=Order.OPEN, restaurant_distances__distance__isnull=True)
+        .exclude(address__in=addresses)
+        .values_list('id', 'address')
+        .distinct()
+    )
+    order_ids = {
+        order_id for order_id, address in unlocated_orders
+        if normalize_address(address) in normalized_addresses
+    } | set(
+        Order.objects
+        .filter(status=Order.OPEN)
+        .filter(address__in=addresses)
+        .values_list('id', flat=True)
+    ) | set(
+        Order.objects
+        .filter(status=Order.OPEN)
+        .filter(available_restaurants__address__in=addresses)
+        .values_list('id', flat=True)
+    )
+    update_order_distances(order_ids)
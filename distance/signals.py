@@ -0,0 +1,97 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_save
+from django.dispatch import receiver
+
+from foodcartapp.models import Order, Restaurant
+
+from .cache import coords_cache
+from .models import OrderRestaurantDistance, PlaceCoords
+from .normalization import normalize_address
+from .order_distances import update_order_distances
+
+
+_UNKNOWN = object()
+
+
+def _remember_address(model, instance, update_fields):
+    # адрес, с которым объект загружен, запоминает post_init; в базу ходим,
+    # только если поле было отложено через only()/defer()
+    if getattr(instance, '_previous_address', _UNKNOWN) is not _UNKNOWN:
+        return
+    if update_fields is not None and 'address' not in update_fields:
+        return
+    instance._previous_address = (
+        model.objects
+        .filter(pk=instance.pk)
+        .values_list('address', flat=True)
+        .first()
+    )
+
+
+def _address_changed(instance, update_fields):
+    if update_fields is not None and 'address' not in update_fields:
+        return False
+    previous_address = getattr(instance, '_previous_address', None)
+    instance._previous_address = instance.address
+    return previous_address not in (None, _UNKNOWN) and previous_address != instance.address
+
+
+@receiver(post_init, sender=Restaurant)
+@receiver(post_init, sender=Order)
+def remember_loaded_address(sender, instance, **kwargs):
+    if instance.pk is None:
+        instance._previous_address = None
+    else:
+        # отложенное поле не читаем: это был бы запрос на каждый экземпляр
+        instance._previous_address = instance.__dict__.get('address', _UNKNOWN)
+
+
+@receiver(post_save, sender=PlaceCoords)
+@receiver(post_delete, sender=PlaceCoords)
+def invalidate_place_coords(sender, instance, **kwargs):
+    coords_cache.delete_many([instance.normalized_address])
+
+
+@receiver(pre_save, sender=Restaurant)
+def remember_restaurant_address(sender, instance, update_fields, **kwargs):
+    _remember_address(Restaurant, instance, update_fields)
+
+
+@receiver(post_save, sender=Restaurant)
+def handle_restaurant_address_change(sender, instance, update_fields, **kwargs):
+    previous_address = getattr(instance, '_previous_address', None)
+    if not _address_changed(instance, update_fields):
+        return
+    coords_cache.delete_many([
+        normalize_address(previous_address),
+        normalize_address(instance.address),
+    ])
+    order_ids = set(
+        Order.objects
+        .filter(status=Order.OPEN, available_restaurants=instance)
+        .values_list('id', flat=True)
+    )
+    transaction.on_commit(lambda: update_order_distances(order_ids))
+
+
+@receiver(pre_save, sender=Order)
+def remember_order_address(sender, instance, update_fields, **kwargs):
+    _remember_address(Order, instance, update_fields)
+
+
+@receiver(post_save, sender=Order)
+def handle_order_address_change(sender, instance, update_fields, **kwargs):
+    if _address_changed(instance, update_fields):
+        transaction.on_commit(lambda: update_order_distances([instance.id]))
+
+
+@receiver(m2m_changed, sender=Order.available_restaurants.through)
+def handle_available_restaurants_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        transaction.on_commit(lambda: update_order_distances([instance.id]))
+    elif action == 'post_clear':
+        OrderRestaurantDistance.objects.filter(restaurant=instance).delete()
+    else:
+        transaction.on_commit(lambda: update_order_distances(pk_set))
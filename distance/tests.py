@@ -1,3 +1,434 @@
-from django.test import TestCase
+import json
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+from geopy import distance as geopy_distance
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from foodcartapp.models import Order
+
+from .cache import coords_cache
+from .coords import resolve_many
+from .geocoder import GeocoderResponseError, GeocoderUnavailable, GetCoordsError, YandexGeocoder
+from .jobs import claim_jobs, enqueue_geocoding, process_jobs
+from .matrix import distance_matrix, pairwise_distances
+from .models import GeocodingJob, PlaceCoords
+from .normalization import normalize_address
+
+
+def geocoder_payload(lon=None, lat=None):
+    members = []
+    if lon is not None:
+        members.append({'GeoObject': {'Point': {'pos': f'{lon} {lat}'}}})
+    return {'response': {'GeoObjectCollection': {'featureMember': members}}}
+
+
+class StubGeocoderServer:
+    """HTTP-сервер, который отвечает заранее заданными ответами по очереди.
+
+    Последний ответ повторяется, когда очередь кончилась. Адреса из
+    запросов складываются в requests.
+    """
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(parse_qs(urlparse(self.path).query)['geocode'][0])
+                status, body = stub.responses.pop(0) if len(stub.responses) > 1 else stub.responses[0]
+                if not isinstance(body, str):
+                    body = json.dumps(body)
+                body = body.encode()
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.server.server_port}/1.x'
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def make_geocoder(url, **kwargs):
+    options = {'retries': 2, 'backoff': 0, 'breaker_threshold': 5, 'breaker_cooldown': 30}
+    options.update(kwargs)
+    return YandexGeocoder('test', url, **options)
+
+
+class YandexGeocoderTest(SimpleTestCase):
+    def test_retries_server_errors(self):
+        with StubGeocoderServer((503, 'busy'), (200, geocoder_payload(37.6, 55.7))) as stub:
+            geocoder = make_geocoder(stub.url)
+            self.assertEqual(geocoder.fetch_coordinates('Москва'), (37.6, 55.7))
+        self.assertEqual(len(stub.requests), 2)
+        self.assertEqual(geocoder.stats()['retries'], 1)
+
+    def test_does_not_retry_client_errors(self):
+        with StubGeocoderServer((403, 'forbidden')) as stub:
+            geocoder = make_geocoder(stub.url)
+            with self.assertRaises(Exception):
+                geocoder.fetch_coordinates('Москва')
+        self.assertEqual(len(stub.requests), 1)
+
+    def test_not_found(self):
+        with StubGeocoderServer((200, geocoder_payload())) as stub:
+            with self.assertRaises(GetCoordsError):
+                make_geocoder(stub.url).fetch_coordinates('нигде')
+
+    def test_malformed_payload_is_retried(self):
+        for body in ['<html>Bad gateway</html>', {'response': {}}, geocoder_payload('x', 'y')]:
+            with self.subTest(body=body), StubGeocoderServer((200, body)) as stub:
+                with self.assertRaises(GeocoderResponseError):
+                    make_geocoder(stub.url).fetch_coordinates('Москва')
+            self.assertEqual(len(stub.requests), 3)
+
+    def test_malformed_payload_is_not_address_error(self):
+        self.assertFalse(issubclass(GeocoderResponseError, GetCoordsError))
+
+    def test_client_error_keeps_breaker_state(self):
+        with StubGeocoderServer((503, 'busy'), (403, 'forbidden'), (503, 'busy')) as stub:
+            geocoder = make_geocoder(stub.url, retries=0, breaker_threshold=2)
+            for _ in range(3):
+                with self.assertRaises(Exception):
+                    geocoder.fetch_coordinates('Москва')
+            with self.assertRaises(GeocoderUnavailable):
+                geocoder.fetch_coordinates('Москва')
+        self.assertEqual(len(stub.requests), 3)
+
+    def test_open_breaker_short_circuits(self):
+        with StubGeocoderServer((503, 'busy')) as stub:
+            geocoder = make_geocoder(stub.url, retries=0, breaker_threshold=2)
+            for _ in range(2):
+                with self.assertRaises(Exception):
+                    geocoder.fetch_coordinates('Москва')
+            with self.assertRaises(GeocoderUnavailable):
+                geocoder.fetch_coordinates('Москва')
+        self.assertEqual(len(stub.requests), 2)
+        self.assertEqual(geocoder.stats()['short_circuited'], 1)
+
+    def test_breaker_recovers_after_malformed_probe(self):
+        responses = [
+            (503, 'busy'),
+            (503, 'busy'),
+            (200, '<html>Bad gateway</html>'),
+            (200, geocoder_payload(37.6, 55.7)),
+        ]
+        with StubGeocoderServer(*responses) as stub:
+            geocoder = make_geocoder(stub.url, retries=0, breaker_threshold=2, breaker_cooldown=0)
+            for _ in range(2):
+                with self.assertRaises(Exception):
+                    geocoder.fetch_coordinates('Москва')
+            with self.assertRaises(GeocoderResponseError):
+                geocoder.fetch_coordinates('Москва')
+            self.assertEqual(geocoder.fetch_coordinates('Москва'), (37.6, 55.7))
+
+    def test_backoff_grows_and_is_capped(self):
+        with StubGeocoderServer((503, 'busy')) as stub:
+            geocoder = make_geocoder(stub.url, retries=4, backoff=1, max_backoff=3)
+            with mock.patch('distance.geocoder.random.uniform', side_effect=lambda low, high: high), \
+                    mock.patch('distance.geocoder.time.sleep') as sleep:
+                with self.assertRaises(Exception):
+                    geocoder.fetch_coordinates('Москва')
+        self.assertEqual([call.args[0] for call in sleep.call_args_list], [1, 2, 3, 3])
+        self.assertEqual(len(stub.requests), 5)
+
+
+@override_settings(GEOCODER_RETRIES=0, GEOCODER_MAX_ATTEMPTS=3, GEOCODER_JOB_BACKOFF=0)
+class GeocodingQueueTest(TestCase):
+    address = 'Москва, Тверская улица, 1'
+
+    def setUp(self):
+        cache.clear()
+        coords_cache.local.clear()
+        patcher = mock.patch('distance.geocoder._geocoder', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def run_worker(self, *responses):
+        with StubGeocoderServer(*responses) as stub, override_settings(YANDEX_GEOCODER_URL=stub.url), \
+                mock.patch('distance.geocoder._geocoder', None):
+            call_command('geocode_worker', '--once', threads=2, stdout=StringIO())
+        return stub.requests
+
+    def test_enqueue_deduplicates(self):
+        enqueue_geocoding([self.address, self.address])
+        enqueue_geocoding([self.address])
+        PlaceCoords.objects.create(address='Москва, Арбат, 2', lon=37.5, lat=55.7)
+        enqueue_geocoding(['Москва, Арбат, 2'])
+        self.assertEqual(list(GeocodingJob.objects.values_list('address', flat=True)), [self.address])
+
+    def test_stores_found_coordinates(self):
+        enqueue_geocoding([self.address])
+        requests = self.run_worker((200, geocoder_payload(37.61, 55.76)))
+
+        self.assertEqual(requests, [self.address])
+        self.assertEqual(GeocodingJob.objects.get().status, GeocodingJob.DONE)
+        place = PlaceCoords.objects.get(address=self.address)
+        self.assertEqual((place.lon, place.lat), (37.61, 55.76))
+
+    def test_stores_not_found_address(self):
+        enqueue_geocoding([self.address])
+        self.run_worker((200, geocoder_payload()))
+
+        self.assertEqual(GeocodingJob.objects.get().status, GeocodingJob.FAILED)
+        place = PlaceCoords.objects.get(address=self.address)
+        self.assertEqual((place.lon, place.lat), (None, None))
+
+    def test_retries_network_errors(self):
+        enqueue_geocoding([self.address])
+        requests = self.run_worker((503, 'busy'), (200, geocoder_payload(37.61, 55.76)))
+
+        job = GeocodingJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (GeocodingJob.DONE, 2))
+        self.assertEqual(len(requests), 2)
+        self.assertTrue(PlaceCoords.objects.filter(address=self.address, lon=37.61).exists())
+
+    def test_gives_up_after_max_attempts(self):
+        enqueue_geocoding([self.address])
+        requests = self.run_worker((503, 'busy'))
+
+        job = GeocodingJob.objects.get()
+        self.assertEqual((job.status, job.attempts, job.last_error), (GeocodingJob.FAILED, 3, 'HTTP 503'))
+        self.assertEqual(len(requests), 3)
+        self.assertFalse(PlaceCoords.objects.exists())
+
+    def test_malformed_response_is_not_stored_as_not_found(self):
+        enqueue_geocoding([self.address])
+        self.run_worker((200, '<html>Bad gateway</html>'))
+
+        job = GeocodingJob.objects.get()
+        self.assertEqual((job.status, job.last_error), (GeocodingJob.FAILED, 'GeocoderResponseError'))
+        self.assertFalse(PlaceCoords.objects.exists())
+
+    def test_enqueue_requeues_transient_failure(self):
+        enqueue_geocoding([self.address])
+        self.run_worker((503, 'busy'))
+        enqueue_geocoding([self.address])
+
+        job = GeocodingJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (GeocodingJob.PENDING, 0))
+        self.run_worker((200, geocoder_payload(37.61, 55.76)))
+        self.assertTrue(PlaceCoords.objects.filter(address=self.address, lon=37.61).exists())
+
+    @override_settings(GEOCODER_JOB_BACKOFF=30)
+    def test_backs_off_after_network_error(self):
+        enqueue_geocoding([self.address])
+        requests = self.run_worker((503, 'busy'))
+
+        job = GeocodingJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (GeocodingJob.PENDING, 1))
+        self.assertGreater(job.next_attempt_at, timezone.now() + timedelta(seconds=20))
+        self.assertEqual(len(requests), 1)
+        self.assertEqual(claim_jobs(10), [])
+
+    @override_settings(GEOCODER_BREAKER_COOLDOWN=30)
+    def test_short_circuit_is_not_an_attempt(self):
+        enqueue_geocoding([self.address])
+        with mock.patch('distance.jobs.fetch_coordinates', side_effect=GeocoderUnavailable('open')):
+            process_jobs(claim_jobs(10))
+
+        job = GeocodingJob.objects.get()
+        self.assertEqual((job.status, job.attempts), (GeocodingJob.PENDING, 0))
+        self.assertGreater(job.next_attempt_at, timezone.now() + timedelta(seconds=20))
+
+
+@override_settings(GEOCODER_RETRIES=0, COORDS_REFRESH_POLICY='background')
+class CoordsRefreshTest(TestCase):
+    address = 'Москва, ул. Тверская, д. 1'
+
+    def setUp(self):
+        cache.clear()
+        coords_cache.local.clear()
+        patcher = mock.patch('distance.geocoder._geocoder', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_stale_place(self, lon=37.61, lat=55.76):
+        place = PlaceCoords.objects.create(address=self.address, lon=lon, lat=lat)
+        PlaceCoords.objects.filter(id=place.id).update(
+            date_of_calculate_coords=timezone.now() - timedelta(days=365),
+        )
+
+    def test_variant_spellings_share_one_job(self):
+        enqueue_geocoding([self.address])
+        enqueue_geocoding(['МОСКВА,  Улица Тверская, дом 1', 'Москва ул Тверская д.1'])
+        self.assertEqual(GeocodingJob.objects.count(), 1)
+
+    def test_failed_refresh_keeps_known_coordinates(self):
+        self.make_stale_place()
+        enqueue_geocoding([self.address], refresh=True)
+        with StubGeocoderServer((200, geocoder_payload())) as stub, override_settings(YANDEX_GEOCODER_URL=stub.url):
+            call_command('geocode_worker', '--once', stdout=StringIO())
+
+        place = PlaceCoords.objects.get()
+        self.assertEqual((place.lon, place.lat), (37.61, 55.76))
+        self.assertGreater(place.date_of_calculate_coords, timezone.now() - timedelta(days=1))
+
+    def test_malformed_response_is_not_negatively_cached(self):
+        with StubGeocoderServer((200, '<html>Bad gateway</html>')) as stub, \
+                override_settings(YANDEX_GEOCODER_URL=stub.url):
+            self.assertEqual(resolve_many([self.address]), {self.address: (None, None)})
+        self.assertFalse(PlaceCoords.objects.exists())
+
+    def test_stale_read_enqueues_refresh_once(self):
+        self.make_stale_place()
+        with mock.patch('distance.coords.enqueue_geocoding', wraps=enqueue_geocoding) as enqueue:
+            for _ in range(3):
+                self.assertEqual(resolve_many([self.address]), {self.address: (37.61, 55.76)})
+
+        refreshed = [call.args[0] for call in enqueue.call_args_list if call.kwargs.get('refresh')]
+        self.assertEqual(refreshed, [[self.address], [], []])
+        self.assertEqual(GeocodingJob.objects.get().status, GeocodingJob.PENDING)
+
+
+@override_settings(COORDS_REFRESH_POLICY='sync')
+class SyncRefreshTest(TestCase):
+    address = 'Москва, ул. Тверская, д. 1'
+
+    def setUp(self):
+        cache.clear()
+        coords_cache.local.clear()
+        place = PlaceCoords.objects.create(address=self.address, lon=37.61, lat=55.76)
+        PlaceCoords.objects.filter(id=place.id).update(
+            date_of_calculate_coords=timezone.now() - timedelta(days=365),
+        )
+
+    def test_background_caller_enqueues_stale_address(self):
+        with mock.patch('distance.coords.fetch_coordinates') as fetch:
+            self.assertEqual(
+                resolve_many([self.address], geocode_missing=False),
+                {self.address: (37.61, 55.76)},
+            )
+        fetch.assert_not_called()
+        self.assertEqual(GeocodingJob.objects.get().status, GeocodingJob.PENDING)
+
+    def test_request_refreshes_stale_address(self):
+        with mock.patch('distance.coords.fetch_coordinates', return_value=(37.62, 55.77)) as fetch:
+            self.assertEqual(resolve_many([self.address]), {self.address: (37.62, 55.77)})
+        fetch.assert_called_once_with(self.address)
+
+
+class OrderAddressTrackingTest(TestCase):
+    def setUp(self):
+        self.order = Order.objects.create(
+            firstname='Иван',
+            lastname='Тестов',
+            phonenumber='+79123456789',
+            address='Москва, Тверская улица, 1',
+        )
+
+    def test_status_change_does_not_read_address(self):
+        order = Order.objects.get(id=self.order.id)
+        order.status = Order.CLOSED
+        with self.assertNumQueries(1), self.captureOnCommitCallbacks() as callbacks:
+            order.save()
+        self.assertEqual(callbacks, [])
+
+    def test_address_change_updates_distances(self):
+        order = Order.objects.get(id=self.order.id)
+        order.address = 'Москва, Арбат, 2'
+        with self.captureOnCommitCallbacks() as callbacks:
+            order.save()
+        self.assertEqual(len(callbacks), 1)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            order.save()
+        self.assertEqual(callbacks, [])
+
+    def test_deferred_address_is_read_on_save(self):
+        order = Order.objects.only('id').get(id=self.order.id)
+        order.address = 'Москва, Арбат, 2'
+        with self.captureOnCommitCallbacks() as callbacks:
+            order.save(update_fields=['address'])
+        self.assertEqual(len(callbacks), 1)
+
+
+class DistanceMatrixTest(SimpleTestCase):
+    origins = [(55.7558, 37.6173), (59.9343, 30.3351), (-33.8688, 151.2093), (0.0, 0.0)]
+    destinations = [(55.7522, 37.6156), (43.1056, 131.8735), (40.7128, -74.0060), (0.5, 179.7)]
+
+    def test_precise_matrix_matches_geodesic(self):
+        distances = distance_matrix(self.origins, self.destinations, precise=True)
+        for row, origin in enumerate(self.origins):
+            for column, destination in enumerate(self.destinations):
+                expected = geopy_distance.geodesic(origin, destination).km
+                self.assertAlmostEqual(distances[row, column], expected, delta=1e-6)
+
+    def test_precise_pairwise_matches_geodesic(self):
+        distances = pairwise_distances(self.origins, self.destinations, precise=True)
+        for distance, origin, destination in zip(distances, self.origins, self.destinations):
+            self.assertAlmostEqual(distance, geopy_distance.geodesic(origin, destination).km, delta=1e-6)
+
+    def test_fast_mode_is_within_half_percent(self):
+        distances = distance_matrix(self.origins, self.destinations)
+        for row, origin in enumerate(self.origins):
+            for column, destination in enumerate(self.destinations):
+                expected = geopy_distance.geodesic(origin, destination).km
+                self.assertLessEqual(abs(distances[row, column] - expected), expected * 0.005 + 1e-9)
+
+    def test_empty_input(self):
+        self.assertEqual(distance_matrix([], self.destinations).shape, (0, len(self.destinations)))
+        self.assertEqual(len(pairwise_distances([], [], precise=True)), 0)
+
+
+class NormalizeAddressTest(SimpleTestCase):
+    def test_spelling_variants_share_a_key(self):
+        variants = [
+            'Москва, ул. Ленина 1',
+            'москва ул.Ленина, 1',
+            'МОСКВА,  улица Ленина,1',
+            'г. Москва, ул Ленина, д. 1',
+        ]
+        keys = {normalize_address(address) for address in variants[:3]}
+        self.assertEqual(keys, {'москва улица ленина 1'})
+        self.assertEqual(normalize_address(variants[3]), 'город москва улица ленина дом 1')
+
+    def test_expands_abbreviations_and_yo(self):
+        self.assertEqual(
+            normalize_address('Санкт-Петербург, Невский пр-т, д. 28, корп. 2'),
+            'санкт-петербург невский проспект дом 28 корпус 2',
+        )
+        self.assertEqual(normalize_address('Ёлкин пер., 5/2'), 'елкин переулок 5/2')
+
+    def test_keeps_different_addresses_apart(self):
+        self.assertNotEqual(normalize_address('ул. Ленина, 1'), normalize_address('ул. Ленина, 11'))
+
+    def test_keeps_building_letters(self):
+        self.assertEqual(normalize_address('Москва, ул. Ленина, 5 г'), 'москва улица ленина 5 г')
+        self.assertEqual(normalize_address('ул. Ленина, 12 д, кв. 3'), 'улица ленина 12 д квартира 3')
+        self.assertEqual(normalize_address('г Москва, д 1 к 2'), 'город москва дом 1 корпус 2')
+
+
+class PlaceCoordsStoreTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        coords_cache.local.clear()
+
+    def test_variants_share_one_row(self):
+        PlaceCoords.objects.store({'Москва, ул. Ленина 1': (37.6, 55.7)})
+        PlaceCoords.objects.store({'москва ул.Ленина, 1': (37.61, 55.71)})
+
+        place = PlaceCoords.objects.get()
+        self.assertEqual((place.address, place.lon, place.lat), ('Москва, ул. Ленина 1', 37.61, 55.71))
+        self.assertEqual(resolve_many(['МОСКВА, улица Ленина, 1']), {'МОСКВА, улица Ленина, 1': (37.61, 55.71)})
@@ -5,11 +5,13 @@ from django.templatetags.static import static
 from django.utils.html import format_html
 from django.utils.http import url_has_allowed_host_and_scheme
 
+from .images import get_variant_url
 from .models import Product
 from .models import ProductCategory
 from .models import Restaurant
 from .models import RestaurantMenuItem
 from .models import Order, OrderItem
+from .models import Banner
 
 
 class RestaurantMenuItemInline(admin.TabularInline):
@@ -99,14 +101,18 @@ class ProductAdmin(admin.ModelAdmin):
     def get_image_preview(self, obj):
         if not obj.image:
             return 'выберите картинку'
-        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.image.url)
+        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=get_variant_url(obj, 320))
     get_image_preview.short_description = 'превью'
 
     def get_image_list_preview(self, obj):
         if not obj.image or not obj.id:
             return 'нет картинки'
         edit_url = reverse('admin:foodcartapp_product_change', args=(obj.id,))
-        return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=obj.image.url)
+        return format_html(
+            '<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>',
+            edit_url=edit_url,
+            src=get_variant_url(obj, 160),
+        )
     get_image_list_preview.short_description = 'превью'
 
 
@@ -122,6 +128,13 @@ class OrderAdmin(admin.ModelAdmin):
     inlines = [
          OrderItemInline,
     ]
+    readonly_fields = [
+        'total_cost',
+    ]
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.update_total_cost()
 
     def response_post_save_change(self, request, obj):
         res = super().response_post_save_change(request, obj)
@@ -130,3 +143,22 @@ class OrderAdmin(admin.ModelAdmin):
                 return HttpResponseRedirect(request.GET['next'])
         else:
             return res
+
+
+@admin.register(Banner)
+class BannerAdmin(admin.ModelAdmin):
+    list_display = [
+        'title',
+        'text',
+        'position',
+        'is_active',
+        'active_from',
+        'active_until',
+    ]
+    list_editable = [
+        'position',
+        'is_active',
+    ]
+    list_filter = [
+        'is_active',
+    ]
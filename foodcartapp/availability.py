@@ -0,0 +1,75 @@
+from collections import defaultdict
+from threading import Lock
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Restaurant, RestaurantMenuItem
+from .versions import bump_version, get_version
+
+
+VERSION_NAME = 'menu_availability'
+
+
+class MenuAvailabilityIndex:
+    def __init__(self):
+        self._lock = Lock()
+        self._version = None
+        self._restaurants_by_product = {}
+        self._all_restaurants = frozenset()
+
+    def _rebuild(self, version):
+        menu_items = (
+            RestaurantMenuItem.objects
+            .filter(availability=True)
+            .values_list('product_id', 'restaurant_id')
+        )
+        restaurants_by_product = defaultdict(set)
+        for product_id, restaurant_id in menu_items:
+            restaurants_by_product[product_id].add(restaurant_id)
+
+        self._restaurants_by_product = {
+            product_id: frozenset(restaurant_ids)
+            for product_id, restaurant_ids in restaurants_by_product.items()
+        }
+        self._all_restaurants = frozenset().union(*self._restaurants_by_product.values())
+        self._version = version
+
+    def _ensure_fresh(self):
+        version = get_version(VERSION_NAME)
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._rebuild(version)
+
+    def restaurants_for_product(self, product_id):
+        self._ensure_fresh()
+        return self._restaurants_by_product.get(product_id, frozenset())
+
+    def restaurants_for_products(self, product_ids):
+        self._ensure_fresh()
+        restaurant_ids = self._all_restaurants
+        for product_id in product_ids:
+            restaurant_ids = restaurant_ids & self._restaurants_by_product.get(product_id, frozenset())
+            if not restaurant_ids:
+                break
+        return restaurant_ids
+
+    def invalidate(self):
+        bump_version(VERSION_NAME)
+        self._version = None
+
+
+menu_availability = MenuAvailabilityIndex()
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def invalidate_menu_availability(sender, **kwargs):
+    # версию меняем только после коммита: иначе соседний запрос успеет
+    # собрать индекс из старых строк и закэшировать его под новой версией
+    transaction.on_commit(menu_availability.invalidate)
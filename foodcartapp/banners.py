@@ -0,0 +1,85 @@
+import hashlib
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import renderers
+from .models import Banner
+from .metrics import registry
+from .versions import bump_version, get_version
+
+
+VERSION_NAME = 'banners'
+
+BannersSnapshot = namedtuple('BannersSnapshot', ['version', 'body', 'etag', 'expires_at'])
+
+_local_snapshot = None
+
+
+def serialize_banner(banner):
+    return {
+        'title': banner.title,
+        'src': banner.image.url,
+        'text': banner.text,
+    }
+
+
+def build_banners_snapshot(version):
+    now = timezone.now()
+    banners = list(Banner.objects.active(now))
+    body = renderers.dumps([serialize_banner(banner) for banner in banners])
+
+    expires_at = now + timedelta(seconds=settings.BANNERS_CACHE_TTL)
+    upcoming_changes = (
+        Banner.objects
+        .filter(is_active=True)
+        .filter(active_from__gt=now)
+        .order_by('active_from')
+        .values_list('active_from', flat=True)
+        .first(),
+        min((banner.active_until for banner in banners if banner.active_until), default=None),
+    )
+    for change_at in upcoming_changes:
+        if change_at and change_at < expires_at:
+            expires_at = change_at
+
+    return BannersSnapshot(
+        version=version,
+        body=body,
+        etag='"{}"'.format(hashlib.sha1(body).hexdigest()),
+        expires_at=expires_at,
+    )
+
+
+def get_banners_snapshot():
+    global _local_snapshot
+
+    now = timezone.now()
+    version = get_version(VERSION_NAME)
+    if _local_snapshot and _local_snapshot.version == version and now < _local_snapshot.expires_at:
+        registry.inc('cache_requests_total', cache='banners', result='local_hit')
+        return _local_snapshot
+
+    cache_key = f'banners:{settings.JSON_RENDERER}:{version}'
+    snapshot = cache.get(cache_key)
+    registry.inc('cache_requests_total', cache='banners', result='miss' if snapshot is None else 'hit')
+    if snapshot is None or now >= snapshot.expires_at:
+        snapshot = build_banners_snapshot(version)
+        timeout = max(1, int((snapshot.expires_at - now).total_seconds()))
+        cache.set(cache_key, snapshot, timeout=timeout)
+    _local_snapshot = snapshot
+    return snapshot
+
+
+@receiver(post_save, sender=Banner)
+@receiver(post_delete, sender=Banner)
+def invalidate_banners(sender, **kwargs):
+    # после коммита: снимок из старых строк под новой версией
+    # достался бы и кэшу, и клиентам на BANNERS_MAX_AGE
+    transaction.on_commit(lambda: bump_version(VERSION_NAME))
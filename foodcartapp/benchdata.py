@@ -0,0 +1,233 @@
+import random
+from dataclasses import dataclass
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max
+from django.test import override_settings
+from django.utils import timezone
+
+from distance.models import OrderRestaurantDistance, PlaceCoords
+from distance.normalization import normalize_address
+from distance.order_distances import update_order_distances
+from .availability import menu_availability
+from .catalog import invalidate_catalog
+from .models import Order, OrderItem, Product, ProductCategory, Restaurant, RestaurantMenuItem
+
+
+BATCH_SIZE = 500
+
+STREETS = [
+    'Тверская улица',
+    'улица Арбат',
+    'Ленинский проспект',
+    'Профсоюзная улица',
+    'улица Покровка',
+    'Кутузовский проспект',
+    'Садовая-Кудринская улица',
+    'улица Большая Дмитровка',
+]
+
+# Москва в пределах МКАД
+LAT_RANGE = (55.57, 55.91)
+LON_RANGE = (37.37, 37.84)
+
+
+@dataclass
+class BenchScale:
+    restaurants: int = 10
+    categories: int = 5
+    products: int = 50
+    orders: int = 200
+    availability: float = 0.8
+    items_per_order: int = 3
+
+    def scaled(self, factor):
+        return BenchScale(
+            restaurants=self.restaurants * factor,
+            categories=self.categories,
+            products=self.products * factor,
+            orders=self.orders * factor,
+            availability=self.availability,
+            items_per_order=self.items_per_order,
+        )
+
+
+def bulk_create_with_ids(model, objs):
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+    # SQLite в Django 3.2 не возвращает id из bulk_create, но раздаёт их по порядку
+    last_id = model.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    model.objects.bulk_create(objs, batch_size=BATCH_SIZE)
+    new_ids = model.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)
+    for obj, obj_id in zip(objs, new_ids):
+        obj.id = obj_id
+    return objs
+
+
+def random_address(rng):
+    return f'Москва, {rng.choice(STREETS)}, дом {rng.randint(1, 200)}, квартира {rng.randint(1, 500)}'
+
+
+def random_coords(rng):
+    return rng.uniform(*LON_RANGE), rng.uniform(*LAT_RANGE)
+
+
+def clear_bench_data():
+    with transaction.atomic():
+        Order.objects.all().delete()
+        RestaurantMenuItem.objects.all().delete()
+        Product.objects.all().delete()
+        ProductCategory.objects.all().delete()
+        Restaurant.objects.all().delete()
+        PlaceCoords.objects.all().delete()
+    invalidate_caches()
+
+
+def isolated_caches():
+    """Подменить все кэши на время замеров приватными LocMemCache.
+
+    Замеры чистят кэш и меняют версии снимков. С общим кэшем из CACHE_URL
+    это стёрло бы рабочий кэш и раздало бы синтетические снимки каталога
+    и баннеров настоящим воркерам.
+    """
+    return override_settings(CACHES={
+        alias: {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': f'bench-{alias}',
+        }
+        for alias in settings.CACHES
+    })
+
+
+def invalidate_caches():
+    menu_availability.invalidate()
+    invalidate_catalog(sender=Product)
+
+
+@transaction.atomic
+def seed_bench_data(scale, seed=0):
+    """Заполнить базу синтетическими ресторанами, меню и заказами.
+
+    При одинаковых scale и seed данные получаются одинаковыми. Записи
+    создаются через bulk_create, поэтому сигналы не срабатывают — кэши
+    сбрасываются в конце явно.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+
+    categories = bulk_create_with_ids(ProductCategory, [
+        ProductCategory(name=f'Категория {number}')
+        for number in range(1, scale.categories + 1)
+    ])
+    products = bulk_create_with_ids(Product, [
+        Product(
+            name=f'Товар {number}',
+            category=rng.choice(categories),
+            price=Decimal(rng.randint(100, 900)),
+            image='bench.jpg',
+            special_status=rng.random() < 0.1,
+            description=f'Описание товара {number}',
+        )
+        for number in range(1, scale.products + 1)
+    ])
+    restaurants = bulk_create_with_ids(Restaurant, [
+        Restaurant(
+            name=f'Star Burger {number}',
+            address=random_address(rng),
+            contact_phone=f'+7 495 {number:07d}',
+        )
+        for number in range(1, scale.restaurants + 1)
+    ])
+
+    menu_items = []
+    restaurants_by_product = {product.id: set() for product in products}
+    for restaurant in restaurants:
+        for product in products:
+            availability = rng.random() < scale.availability
+            menu_items.append(RestaurantMenuItem(
+                restaurant=restaurant,
+                product=product,
+                availability=availability,
+            ))
+            if availability:
+                restaurants_by_product[product.id].add(restaurant.id)
+    RestaurantMenuItem.objects.bulk_create(menu_items, batch_size=BATCH_SIZE)
+
+    orders = []
+    order_products = []
+    for number in range(scale.orders):
+        order_lines = [
+            (product, rng.randint(1, 3))
+            for product in rng.sample(products, min(scale.items_per_order, len(products)))
+        ]
+        order = Order(
+            firstname='Покупатель',
+            lastname=str(number),
+            phonenumber=f'+7912{number:07d}',
+            address=random_address(rng),
+            registrated_at=now - timedelta(minutes=scale.orders - number),
+            payment_method=rng.choice([Order.OFFLINE, Order.ONLINE, Order.UNDEFINED]),
+            total_cost=sum(product.price * quantity for product, quantity in order_lines),
+        )
+        orders.append(order)
+        order_products.append(order_lines)
+    bulk_create_with_ids(Order, orders)
+
+    order_items = []
+    restaurant_links = []
+    RestaurantLink = Order.available_restaurants.through
+    for order, order_lines in zip(orders, order_products):
+        restaurant_ids = set(restaurants_by_product[order_lines[0][0].id])
+        for product, quantity in order_lines:
+            order_items.append(OrderItem(
+                order=order,
+                product=product,
+                quantity=quantity,
+                cost=product.price * quantity,
+            ))
+            restaurant_ids &= restaurants_by_product[product.id]
+        restaurant_links.extend(
+            RestaurantLink(order_id=order.id, restaurant_id=restaurant_id)
+            for restaurant_id in restaurant_ids
+        )
+    OrderItem.objects.bulk_create(order_items, batch_size=BATCH_SIZE)
+    RestaurantLink.objects.bulk_create(restaurant_links, batch_size=BATCH_SIZE)
+
+    addresses = {restaurant.address for restaurant in restaurants} | {order.address for order in orders}
+    known_addresses = set(
+        PlaceCoords.objects
+        .filter(normalized_address__in={normalize_address(address) for address in addresses})
+        .values_list('normalized_address', flat=True)
+    )
+    places = {}
+    for address in sorted(addresses):
+        normalized_address = normalize_address(address)
+        if normalized_address in known_addresses or normalized_address in places:
+            continue
+        lon, lat = random_coords(rng)
+        places[normalized_address] = PlaceCoords(
+            address=address,
+            normalized_address=normalized_address,
+            lon=lon,
+            lat=lat,
+        )
+    PlaceCoords.objects.bulk_create(places.values(), batch_size=BATCH_SIZE)
+
+    invalidate_caches()
+    order_ids = [order.id for order in orders]
+    for start in range(0, len(order_ids), BATCH_SIZE):
+        update_order_distances(order_ids[start:start + BATCH_SIZE])
+
+    return {
+        'categories': len(categories),
+        'products': len(products),
+        'restaurants': len(restaurants),
+        'menu_items': len(menu_items),
+        'orders': len(orders),
+        'order_items': len(order_items),
+        'place_coords': len(places),
+        'distances': OrderRestaurantDistance.objects.filter(order_id__in=order_ids).count(),
+    }
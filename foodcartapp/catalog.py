@@ -0,0 +1,83 @@
+import hashlib
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import renderers
+from .images import serialize_image_variants
+from .models import Product, ProductCategory, RestaurantMenuItem
+from .metrics import registry
+from .versions import bump_version, get_version
+
+
+VERSION_NAME = 'catalog'
+
+CatalogSnapshot = namedtuple('CatalogSnapshot', ['version', 'body', 'etag', 'last_modified'])
+
+_local_snapshot = None
+
+
+def serialize_product(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'price': product.price,
+        'special_status': product.special_status,
+        'description': product.description,
+        'category': {
+            'id': product.category.id,
+            'name': product.category.name,
+        } if product.category else None,
+        'image': product.image.url,
+        'image_variants': serialize_image_variants(product),
+        'restaurant': {
+            'id': product.id,
+            'name': product.name,
+        }
+    }
+
+
+def build_catalog_snapshot(version):
+    products = Product.objects.available().select_related('category').order_by('id')
+    body = renderers.dumps([serialize_product(product) for product in products])
+    return CatalogSnapshot(
+        version=version,
+        body=body,
+        etag='"{}"'.format(hashlib.sha1(body).hexdigest()),
+        last_modified=int(time.time()),
+    )
+
+
+def get_catalog_snapshot():
+    global _local_snapshot
+
+    version = get_version(VERSION_NAME)
+    if _local_snapshot and _local_snapshot.version == version:
+        registry.inc('cache_requests_total', cache='catalog', result='local_hit')
+        return _local_snapshot
+
+    cache_key = f'catalog:{settings.JSON_RENDERER}:{version}'
+    snapshot = cache.get(cache_key)
+    registry.inc('cache_requests_total', cache='catalog', result='miss' if snapshot is None else 'hit')
+    if snapshot is None:
+        snapshot = build_catalog_snapshot(version)
+        cache.set(cache_key, snapshot, timeout=settings.CATALOG_CACHE_TTL)
+    _local_snapshot = snapshot
+    return snapshot
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def invalidate_catalog(sender, **kwargs):
+    # версию меняем после коммита, иначе снимок из старых строк
+    # мог бы попасть в кэш под новой версией на CATALOG_CACHE_TTL
+    transaction.on_commit(lambda: bump_version(VERSION_NAME))
@@ -0,0 +1,162 @@
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from PIL import Image, ImageOps, features
+
+from .models import Product
+
+
+logger = logging.getLogger(__name__)
+
+# что Pillow бросает на битом, обрезанном или слишком большом файле
+IMAGE_ERRORS = (OSError, ValueError, Image.DecompressionBombError)
+
+VARIANT_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+VARIANT_EXTENSIONS = {
+    'webp': 'webp',
+    'jpeg': 'jpg',
+}
+
+
+def get_variant_formats():
+    formats = ['jpeg']
+    if features.check('webp'):
+        formats.insert(0, 'webp')
+    return formats
+
+
+def get_variant_name(name, width, variant_format):
+    stem, _ = os.path.splitext(name)
+    return f'{stem}_{width}w.{VARIANT_EXTENSIONS[variant_format]}'
+
+
+def render_variants(source, widths, formats):
+    """Вернуть {(формат, ширина): байты} для картинки из байтов source.
+
+    Картинки меньше нужной ширины не растягиваются. Метаданные (EXIF, ICC,
+    комментарии) в варианты не попадают: Pillow сохраняет их только если
+    передать явно. Функция не трогает Django и годится для пула процессов.
+    """
+    with Image.open(io.BytesIO(source)) as image:
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+        variants = {}
+        for width in widths:
+            if image.width > width:
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.LANCZOS)
+            else:
+                resized = image
+            for variant_format in formats:
+                frame = resized
+                if variant_format == 'jpeg' and frame.mode == 'RGBA':
+                    frame = Image.new('RGB', frame.size, 'white')
+                    frame.paste(resized, mask=resized.getchannel('A'))
+                output = io.BytesIO()
+                frame.save(output, **VARIANT_FORMATS[variant_format])
+                variants[(variant_format, width)] = output.getvalue()
+        return variants
+
+
+def save_variants(name, variants, storage=default_storage):
+    saved = {'source': name}
+    for (variant_format, width), content in sorted(variants.items()):
+        variant_name = get_variant_name(name, width, variant_format)
+        if storage.exists(variant_name):
+            storage.delete(variant_name)
+        saved.setdefault(variant_format, {})[str(width)] = storage.save(variant_name, ContentFile(content))
+    return saved
+
+
+def delete_variants(image_variants, storage, keep=()):
+    for variant_format in VARIANT_EXTENSIONS:
+        for variant_name in image_variants.get(variant_format, {}).values():
+            if variant_name not in keep:
+                storage.delete(variant_name)
+
+
+def store_product_variants(product, variants):
+    """Сохранить копии картинки товара и удалить копии его прежней картинки."""
+    storage = product.image.storage
+    image_variants = save_variants(product.image.name, variants, storage=storage)
+    Product.objects.filter(pk=product.pk).update(image_variants=image_variants)
+    delete_variants(
+        product.image_variants,
+        storage,
+        keep={
+            variant_name
+            for variant_format in VARIANT_EXTENSIONS
+            for variant_name in image_variants.get(variant_format, {}).values()
+        },
+    )
+    product.image_variants = image_variants
+    return image_variants
+
+
+def generate_product_variants(product):
+    with product.image.open('rb') as image_file:
+        source = image_file.read()
+    variants = render_variants(source, settings.PRODUCT_IMAGE_WIDTHS, get_variant_formats())
+    return store_product_variants(product, variants)
+
+
+def get_current_variants(product):
+    # копии прежней картинки не отдаём: пока новые не готовы, нужен оригинал
+    if product.image_variants.get('source') != product.image.name:
+        return {}
+    return product.image_variants
+
+
+def get_variant_url(product, width, variant_format='jpeg'):
+    variant_name = get_current_variants(product).get(variant_format, {}).get(str(width))
+    if not variant_name:
+        return product.image.url
+    return product.image.storage.url(variant_name)
+
+
+def serialize_image_variants(product):
+    storage = product.image.storage
+    image_variants = get_current_variants(product)
+    return {
+        variant_format: {
+            width: storage.url(variant_name)
+            for width, variant_name in image_variants.get(variant_format, {}).items()
+        }
+        for variant_format in VARIANT_EXTENSIONS
+        if image_variants.get(variant_format)
+    }
+
+
+def refresh_product_variants(product):
+    from .catalog import invalidate_catalog
+
+    try:
+        generate_product_variants(product)
+    except IMAGE_ERRORS as error:
+        logger.warning('Товар %s: не удалось обработать %s: %s', product.pk, product.image.name, error)
+        return
+    invalidate_catalog(sender=Product)
+
+
+@receiver(post_save, sender=Product)
+def update_product_variants(sender, instance, raw=False, **kwargs):
+    if raw or not instance.image:
+        return
+    if instance.image_variants.get('source') == instance.image.name:
+        return
+    # Pillow работает после коммита, чтобы не держать открытой транзакцию
+    # админки, а битая картинка не откатывала сохранение товара
+    transaction.on_commit(lambda: refresh_product_variants(instance))
@@ -0,0 +1,153 @@
+import json
+import math
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from foodcartapp.benchdata import BenchScale, clear_bench_data, isolated_caches, seed_bench_data
+from foodcartapp.models import Product
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Замеряет скорость основных страниц на синтетических данных в отдельной тестовой базе'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scales',
+            default='1,5,25',
+            help='Множители размера данных через запятую',
+        )
+        parser.add_argument('--requests', type=int, default=30, help='Запросов на каждую страницу')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--label', default='', help='Метка замера, например версия релиза')
+        parser.add_argument('--output', default='bench-results.json')
+
+    def handle(self, *args, **options):
+        try:
+            scales = [int(scale) for scale in options['scales'].split(',')]
+        except ValueError:
+            raise CommandError('--scales должен быть списком целых чисел через запятую')
+
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        runner.setup_test_environment()
+        old_config = runner.setup_databases()
+        try:
+            with isolated_caches():
+                results = [self.run_scale(scale, options) for scale in scales]
+        finally:
+            runner.teardown_databases(old_config)
+            runner.teardown_test_environment()
+
+        report = {
+            'label': options['label'],
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'requests': options['requests'],
+            'seed': options['seed'],
+            'results': results,
+        }
+        with open(options['output'], 'w') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        self.stdout.write(f'Результаты записаны в {options["output"]}')
+
+    def run_scale(self, factor, options):
+        clear_bench_data()
+        cache.clear()
+        scale = BenchScale().scaled(factor)
+        dataset = seed_bench_data(scale, seed=options['seed'])
+        self.stdout.write(f'Масштаб {factor}: {dataset}')
+
+        rng = random.Random(options['seed'])
+        product_ids = list(Product.objects.available().values_list('id', flat=True))
+        manager = get_user_model().objects.create_user('bench', is_staff=True)
+        client = Client()
+        client.force_login(manager)
+
+        def post_order():
+            order = {
+                'firstname': 'Иван',
+                'lastname': 'Тестов',
+                'phonenumber': '+79123456789',
+                'address': 'Москва, Тверская улица, дом 1',
+                'products': [
+                    {'product': product_id, 'quantity': 1}
+                    for product_id in rng.sample(product_ids, min(scale.items_per_order, len(product_ids)))
+                ],
+            }
+            return client.post('/api/order/', json.dumps(order), content_type='application/json')
+
+        endpoints = {
+            '/api/products/': lambda: client.get('/api/products/'),
+            '/api/order/': post_order,
+            '/manager/orders/': lambda: client.get('/manager/orders/'),
+            '/manager/products/': lambda: client.get('/manager/products/'),
+        }
+        measurements = {}
+        for name, make_request in endpoints.items():
+            measurements[name] = self.measure(make_request, options['requests'])
+            self.stdout.write(
+                f'  {name}: p50 {measurements[name]["p50_ms"]:.1f} мс, '
+                f'p95 {measurements[name]["p95_ms"]:.1f} мс, '
+                f'запросов к БД {measurements[name]["queries_max"]}, '
+                f'память {measurements[name]["peak_memory_kb"]:.0f} КБ'
+            )
+
+        manager.delete()
+        return {
+            'scale': factor,
+            'dataset': dataset,
+            'endpoints': measurements,
+        }
+
+    def measure(self, make_request, repeat):
+        started_at = time.perf_counter()
+        self.check_response(make_request())
+        cold = time.perf_counter() - started_at
+
+        timings = []
+        queries = []
+        for _ in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started_at = time.perf_counter()
+                self.check_response(make_request())
+                timings.append((time.perf_counter() - started_at) * 1000)
+            queries.append(len(captured))
+
+        tracemalloc.start()
+        try:
+            self.check_response(make_request())
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'cold_ms': cold * 1000,
+            'mean_ms': statistics.mean(timings),
+            'p50_ms': percentile(timings, 50),
+            'p95_ms': percentile(timings, 95),
+            'p99_ms': percentile(timings, 99),
+            'max_ms': max(timings),
+            'queries_min': min(queries),
+            'queries_max': max(queries),
+            'peak_memory_kb': peak_memory / 1024,
+        }
+
+    @staticmethod
+    def check_response(response):
+        if response.status_code != 200:
+            raise CommandError(f'{response.request["PATH_INFO"]} ответил {response.status_code}')
@@ -0,0 +1,79 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import Client
+
+from foodcartapp.models import Product
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает скорость приёма заказов по одному и пачкой. Созданные заказы откатываются'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=200)
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--items', type=int, default=3, help='Позиций в заказе')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def make_orders(self, product_ids, count, items):
+        orders = []
+        for number in range(count):
+            orders.append({
+                'firstname': 'Иван',
+                'lastname': f'Тестов {number}',
+                'phonenumber': f'+7912{number:07d}',
+                'address': f'Москва, Тверская улица, {number % 50 + 1}',
+                'products': [
+                    {'product': product_id, 'quantity': self.random.randint(1, 3)}
+                    for product_id in self.random.sample(product_ids, min(items, len(product_ids)))
+                ],
+            })
+        return orders
+
+    def post(self, client, url, payload):
+        response = client.post(url, json.dumps(payload), content_type='application/json')
+        if response.status_code != 200:
+            raise CommandError(f'{url} ответил {response.status_code}: {response.content[:200]!r}')
+        return response
+
+    def measure(self, run):
+        try:
+            with transaction.atomic():
+                started_at = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - started_at
+                raise Rollback
+        except Rollback:
+            pass
+        return elapsed
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        product_ids = list(Product.objects.available().values_list('id', flat=True))
+        if not product_ids:
+            raise CommandError('Нет доступных товаров: сначала заполните меню ресторанов')
+
+        orders = self.make_orders(product_ids, options['orders'], options['items'])
+        client = Client(SERVER_NAME='localhost')
+        batch_size = options['batch_size']
+
+        def single():
+            for order in orders:
+                self.post(client, '/api/order/', order)
+
+        def bulk():
+            for start in range(0, len(orders), batch_size):
+                self.post(client, '/api/orders/bulk/', orders[start:start + batch_size])
+
+        for name, run in [('по одному', single), (f'пачками по {batch_size}', bulk)]:
+            elapsed = self.measure(run)
+            self.stdout.write(
+                f'{name}: {len(orders)} заказов за {elapsed:.2f} с, {len(orders) / elapsed:.0f} заказов/с'
+            )
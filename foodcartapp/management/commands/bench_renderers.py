@@ -0,0 +1,51 @@
+import gzip
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from foodcartapp.catalog import serialize_product
+from foodcartapp.middleware import brotli
+from foodcartapp.models import Product
+from foodcartapp.renderers import dumps_compact, dumps_pretty, orjson
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает размер и время сериализации каталога в разных режимах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200, help='Сколько раз сериализовать каталог')
+        parser.add_argument(
+            '--scale',
+            type=int,
+            default=1,
+            help='Во сколько раз размножить товары, чтобы оценить большой каталог',
+        )
+
+    def measure(self, dumps, data, repeat):
+        started_at = time.perf_counter()
+        for _ in range(repeat):
+            body = dumps(data)
+        return body, (time.perf_counter() - started_at) / repeat
+
+    def handle(self, *args, **options):
+        products = Product.objects.available().select_related('category').order_by('id')
+        data = [serialize_product(product) for product in products] * options['scale']
+        if not data:
+            raise CommandError('Нет доступных товаров: сначала заполните меню ресторанов')
+
+        encoders = [('pretty', dumps_pretty), ('compact', dumps_compact)]
+        if orjson:
+            encoders.append(('compact без orjson', lambda data: json.dumps(
+                data, cls=DjangoJSONEncoder, ensure_ascii=False, separators=(',', ':'),
+            ).encode()))
+        self.stdout.write(
+            f'Товаров: {len(data)}, orjson: {"да" if orjson else "нет"}, brotli: {"да" if brotli else "нет"}'
+        )
+        for name, dumps in encoders:
+            body, elapsed = self.measure(dumps, data, options['repeat'])
+            sizes = [f'{len(body)} Б', f'gzip {len(gzip.compress(body, compresslevel=6))} Б']
+            if brotli:
+                sizes.append(f'br {len(brotli.compress(body, quality=5))} Б')
+            self.stdout.write(f'{name}: {elapsed * 1000:.3f} мс, ' + ', '.join(sizes))
@@ -0,0 +1,73 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.runner import DiscoverRunner
+
+from foodcartapp.benchdata import BenchScale, clear_bench_data, isolated_caches, seed_bench_data
+from foodcartapp.query_budgets import QUERY_BUDGETS, group_by_call_site, make_budget_context, measure_budget
+
+
+class Command(BaseCommand):
+    help = 'Проверяет, что страницы укладываются в бюджет запросов к БД на разных объёмах данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='1,3', help='Множители размера данных через запятую')
+        parser.add_argument('--cart-lines', type=int, default=5, help='Позиций в тестовом заказе')
+        parser.add_argument('--bulk-orders', type=int, default=20, help='Заказов в тестовой пачке')
+        parser.add_argument('--only', nargs='*', help='Проверить только бюджеты с этими именами')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            scales = [int(scale) for scale in options['scales'].split(',')]
+        except ValueError:
+            raise CommandError('--scales должен быть списком целых чисел через запятую')
+        budgets = [
+            budget for budget in QUERY_BUDGETS
+            if not options['only'] or budget.name in options['only']
+        ]
+
+        runner = DiscoverRunner(verbosity=0, interactive=False)
+        runner.setup_test_environment()
+        old_config = runner.setup_databases()
+        try:
+            failures = []
+            with isolated_caches():
+                for scale in scales:
+                    failures.extend(self.check_scale(scale, budgets, options))
+        finally:
+            runner.teardown_databases(old_config)
+            runner.teardown_test_environment()
+
+        if failures:
+            raise CommandError(f'Превышено бюджетов: {len(failures)}')
+        self.stdout.write(self.style.SUCCESS('Все страницы уложились в бюджет запросов'))
+
+    def check_scale(self, factor, budgets, options):
+        clear_bench_data()
+        dataset = seed_bench_data(BenchScale().scaled(factor), seed=options['seed'])
+        context = make_budget_context(dataset, options['cart_lines'], options['bulk_orders'])
+        manager = get_user_model().objects.create_user('budget', is_staff=True)
+        client = Client()
+        client.force_login(manager)
+
+        self.stdout.write(f'Масштаб {factor}: {dataset}')
+        failures = []
+        for budget in budgets:
+            response, queries = measure_budget(budget, client, context)
+            if response.status_code != 200:
+                raise CommandError(f'{budget.path} ответил {response.status_code}')
+
+            limit = budget.limit(context['sizes'])
+            if len(queries) <= limit:
+                self.stdout.write(f'  {budget.name}: {len(queries)} из {limit}')
+                continue
+
+            failures.append(budget.name)
+            self.stdout.write(self.style.ERROR(f'  {budget.name}: {len(queries)} запросов, бюджет {limit}'))
+            for call_site, count, sql in group_by_call_site(queries):
+                self.stdout.write(f'    {count} × {call_site}')
+                self.stdout.write(f'        {sql[:300]}')
+
+        manager.delete()
+        return failures
@@ -0,0 +1,56 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from foodcartapp.catalog import invalidate_catalog
+from foodcartapp.images import IMAGE_ERRORS, get_variant_formats, render_variants, store_product_variants
+from foodcartapp.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Готовит уменьшенные копии картинок товаров'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Пересоздать копии и для товаров, у которых они уже есть',
+        )
+        parser.add_argument('--workers', type=int, default=None)
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').order_by('id')
+        if not options['all']:
+            products = [
+                product for product in products
+                if product.image_variants.get('source') != product.image.name
+            ]
+
+        widths = settings.PRODUCT_IMAGE_WIDTHS
+        formats = get_variant_formats()
+        processed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {}
+            for product in products:
+                try:
+                    with product.image.open('rb') as image_file:
+                        source = image_file.read()
+                except OSError as error:
+                    self.stderr.write(f'Товар {product.id}: не удалось прочитать {product.image.name}: {error}')
+                    continue
+                futures[executor.submit(render_variants, source, widths, formats)] = product
+
+            for future in as_completed(futures):
+                product = futures[future]
+                try:
+                    variants = future.result()
+                except IMAGE_ERRORS as error:
+                    self.stderr.write(f'Товар {product.id}: не удалось обработать {product.image.name}: {error}')
+                    continue
+                store_product_variants(product, variants)
+                processed += 1
+
+        if processed:
+            invalidate_catalog(sender=Product)
+        self.stdout.write(f'Обработано товаров: {processed}')
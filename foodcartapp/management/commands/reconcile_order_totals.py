@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from foodcartapp.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Сверяет сохранённую стоимость заказов с суммой их позиций'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--fix',
+            action='store_true',
+            help='Исправить расхождения',
+        )
+
+    def handle(self, *args, **options):
+        drifted_orders = list(
+            Order.objects
+            .with_actual_cost()
+            .exclude(total_cost=F('actual_cost'))
+            .only('id', 'total_cost')
+        )
+        for order in drifted_orders:
+            self.stdout.write(f'Заказ {order.id}: сохранено {order.total_cost}, по позициям {order.actual_cost}')
+
+        if options['fix'] and drifted_orders:
+            for order in drifted_orders:
+                order.total_cost = order.actual_cost
+            Order.objects.bulk_update(drifted_orders, ['total_cost'], batch_size=500)
+        self.stdout.write(f'Заказов с расхождениями: {len(drifted_orders)}')
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.benchdata import BenchScale, clear_bench_data, seed_bench_data
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими ресторанами, товарами и заказами для замеров скорости'
+
+    def add_arguments(self, parser):
+        defaults = BenchScale()
+        parser.add_argument('--restaurants', type=int, default=defaults.restaurants)
+        parser.add_argument('--categories', type=int, default=defaults.categories)
+        parser.add_argument('--products', type=int, default=defaults.products)
+        parser.add_argument('--orders', type=int, default=defaults.orders)
+        parser.add_argument(
+            '--availability',
+            type=float,
+            default=defaults.availability,
+            help='Доля пунктов меню, которые есть в продаже',
+        )
+        parser.add_argument('--items-per-order', type=int, default=defaults.items_per_order)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Сначала удалить все заказы, товары, рестораны и координаты',
+        )
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            clear_bench_data()
+        scale = BenchScale(
+            restaurants=options['restaurants'],
+            categories=options['categories'],
+            products=options['products'],
+            orders=options['orders'],
+            availability=options['availability'],
+            items_per_order=options['items_per_order'],
+        )
+        created = seed_bench_data(scale, seed=options['seed'])
+        for name, count in created.items():
+            self.stdout.write(f'{name}: {count}')
@@ -0,0 +1,179 @@
+import glob
+import json
+import os
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+
+from django.conf import settings
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _labels_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+class MetricsRegistry:
+    """Счётчики и гистограммы одного процесса.
+
+    Каждый процесс периодически сбрасывает свои значения в отдельный файл
+    в settings.METRICS_DIR, а /metrics складывает файлы всех процессов.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._counters = defaultdict(float)
+        self._histograms = {}
+        self._flushed_at = 0
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[(name, _labels_key(labels))] += value
+
+    def _observe(self, key, value, buckets):
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = {
+                'buckets': list(buckets),
+                'counts': [0] * (len(buckets) + 1),
+                'sum': 0.0,
+            }
+        histogram['counts'][bisect_left(histogram['buckets'], value)] += 1
+        histogram['sum'] += value
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        with self._lock:
+            self._observe((name, _labels_key(labels)), value, buckets)
+
+    def record_request(self, route, method, status, duration, queries, queries_duration):
+        route_labels = (('route', route),)
+        request_labels = (('method', method), ('route', route), ('status', str(status)))
+        with self._lock:
+            self._counters[('http_requests_total', request_labels)] += 1
+            self._counters[('db_queries_total', route_labels)] += queries
+            self._counters[('db_query_duration_seconds_total', route_labels)] += queries_duration
+            self._observe(
+                ('http_request_duration_seconds', (('method', method), ('route', route))),
+                duration,
+                LATENCY_BUCKETS,
+            )
+
+    def snapshot(self):
+        with self._lock:
+            counters = [
+                [name, dict(labels), value]
+                for (name, labels), value in self._counters.items()
+            ]
+            histograms = [
+                [name, dict(labels), {**histogram, 'counts': list(histogram['counts'])}]
+                for (name, labels), histogram in self._histograms.items()
+            ]
+        return {'counters': counters + collect_component_counters(), 'histograms': histograms}
+
+    def flush(self, force=False):
+        if not settings.METRICS_DIR:
+            return
+        now = time.monotonic()
+        if not force and now - self._flushed_at < settings.METRICS_FLUSH_INTERVAL:
+            return
+        self._flushed_at = now
+
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        path = os.path.join(settings.METRICS_DIR, f'metrics-{os.getpid()}.json')
+        temporary_path = f'{path}.tmp'
+        with open(temporary_path, 'w') as metrics_file:
+            json.dump(self.snapshot(), metrics_file)
+        os.replace(temporary_path, path)
+
+
+def collect_component_counters():
+    from distance.cache import coords_cache
+    from distance.geocoder import get_geocoder
+
+    coords_stats = coords_cache.stats()
+    geocoder_stats = get_geocoder().stats()
+    return [
+        ['cache_requests_total', {'cache': 'coords_local', 'result': 'hit'}, coords_stats['hits']],
+        ['cache_requests_total', {'cache': 'coords_local', 'result': 'miss'}, coords_stats['misses']],
+        ['cache_requests_total', {'cache': 'coords_shared', 'result': 'hit'}, coords_stats['shared_hits']],
+        ['cache_requests_total', {'cache': 'coords_shared', 'result': 'miss'}, coords_stats['shared_misses']],
+        ['geocoder_requests_total', {}, geocoder_stats['requests']],
+        ['geocoder_errors_total', {}, geocoder_stats['errors']],
+        ['geocoder_retries_total', {}, geocoder_stats['retries']],
+        ['geocoder_not_found_total', {}, geocoder_stats['not_found']],
+        ['geocoder_short_circuited_total', {}, geocoder_stats['short_circuited']],
+    ]
+
+
+def load_snapshots():
+    if not settings.METRICS_DIR:
+        return [registry.snapshot()]
+    registry.flush(force=True)
+    snapshots = []
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, 'metrics-*.json')):
+        try:
+            with open(path) as metrics_file:
+                snapshots.append(json.load(metrics_file))
+        except (OSError, ValueError):
+            continue
+    return snapshots
+
+
+def aggregate(snapshots):
+    counters = defaultdict(float)
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot['counters']:
+            counters[(name, _labels_key(labels))] += value
+        for name, labels, histogram in snapshot['histograms']:
+            key = (name, _labels_key(labels))
+            total = histograms.get(key)
+            if total is None or total['buckets'] != histogram['buckets']:
+                histograms[key] = {**histogram, 'counts': list(histogram['counts'])}
+                continue
+            total['counts'] = [a + b for a, b in zip(total['counts'], histogram['counts'])]
+            total['sum'] += histogram['sum']
+    return counters, histograms
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    escaped = (
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    )
+    return '{' + ','.join(f'{name}="{value}"' for name, value in escaped) + '}'
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def render_prometheus(counters, histograms):
+    lines = []
+    typed = set()
+    for (name, labels), value in sorted(counters.items()):
+        if name not in typed:
+            lines.append(f'# TYPE {name} counter')
+            typed.add(name)
+        lines.append(f'{name}{_format_labels(labels)} {_format_number(value)}')
+
+    for (name, labels), histogram in sorted(histograms.items()):
+        if name not in typed:
+            lines.append(f'# TYPE {name} histogram')
+            typed.add(name)
+        cumulative = 0
+        for bound, count in zip([*histogram['buckets'], '+Inf'], histogram['counts']):
+            cumulative += count
+            bucket_labels = (*labels, ('le', bound if bound == '+Inf' else repr(float(bound))))
+            lines.append(f'{name}_bucket{_format_labels(bucket_labels)} {cumulative}')
+        lines.append(f'{name}_sum{_format_labels(labels)} {_format_number(histogram["sum"])}')
+        lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
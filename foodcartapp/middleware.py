@@ -0,0 +1,94 @@
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from .metrics import registry
+
+
+re_accepts_brotli = _lazy_re_compile(r'\bbr\b')
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """Сжимает крупные ответы brotli, если его поддерживают клиент и сервер, иначе gzip.
+
+    Сжимаются только ответы на COMPRESSION_PATHS: в HTML-страницах
+    менеджера и админки есть CSRF-токен, и сжатие открыло бы их для BREACH.
+    """
+
+    def process_response(self, request, response):
+        if not request.path.startswith(tuple(settings.COMPRESSION_PATHS)):
+            return response
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        accepts_brotli = re_accepts_brotli.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if brotli is None or response.streaming or not accepts_brotli:
+            return super().process_response(request, response)
+        if response.has_header('Content-Encoding'):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed_content = brotli.compress(response.content, quality=settings.BROTLI_QUALITY)
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started_at
+
+
+class MetricsMiddleware(MiddlewareMixin):
+    """Считает время ответа и запросы к БД по маршрутам для /metrics."""
+
+    def process_request(self, request):
+        request._query_stats = QueryStats()
+        request._execute_wrappers = connections[DEFAULT_DB_ALIAS].execute_wrappers
+        request._execute_wrappers.append(request._query_stats)
+        request._metrics_started_at = time.perf_counter()
+
+    def process_response(self, request, response):
+        elapsed = time.perf_counter() - getattr(request, '_metrics_started_at', 0)
+        query_stats = getattr(request, '_query_stats', None)
+        if query_stats is None:
+            return response
+        if query_stats in request._execute_wrappers:
+            request._execute_wrappers.remove(query_stats)
+
+        resolver_match = request.resolver_match
+        registry.record_request(
+            route=resolver_match.route if resolver_match else 'unmatched',
+            method=request.method,
+            status=response.status_code,
+            duration=elapsed,
+            queries=query_stats.count,
+            queries_duration=query_stats.duration,
+        )
+        registry.flush()
+        return response
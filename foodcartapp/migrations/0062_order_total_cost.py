@@ -0,0 +1,34 @@
+# Generated by Django 3.2 on 2026-10-18 17:17
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+
+
+def fill_total_cost(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    OrderItem = apps.get_model('foodcartapp', 'OrderItem')
+    order_costs = (
+        OrderItem.objects
+        .filter(order=OuterRef('pk'))
+        .values('order')
+        .annotate(total_cost=Sum('cost'))
+        .values('total_cost')
+    )
+    Order.objects.filter(products__isnull=False).distinct().update(total_cost=Subquery(order_costs))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0061_alter_orderitem_quantity'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_cost',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Стоимость заказа'),
+        ),
+        migrations.RunPython(fill_total_cost, migrations.RunPython.noop),
+    ]
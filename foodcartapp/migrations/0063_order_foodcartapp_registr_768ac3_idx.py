@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 17:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0062_order_total_cost'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['registrated_at', 'id'], name='foodcartapp_registr_768ac3_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db import migrations
+
+
+BANNERS = [
+    ('Burger', 'burger.jpg', 'Tasty Burger at your door step'),
+    ('Spices', 'food.jpg', 'All Cuisines'),
+    ('New York', 'tasty.jpg', 'Food is incomplete without a tasty dessert'),
+]
+
+
+def fill_banners(apps, schema_editor):
+    Banner = apps.get_model('foodcartapp', 'Banner')
+    if Banner.objects.exists():
+        return
+
+    for position, (title, filename, text) in enumerate(BANNERS):
+        path = os.path.join(settings.BASE_DIR, 'assets', filename)
+        if not os.path.exists(path):
+            continue
+        banner = Banner(title=title, text=text, position=position)
+        name = banner.image.field.generate_filename(banner, filename)
+        if banner.image.storage.exists(name):
+            banner.image.name = name
+        else:
+            with open(path, 'rb') as image:
+                banner.image.save(filename, File(image), save=False)
+        banner.save()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0064_banner'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_banners, migrations.RunPython.noop),
+    ]
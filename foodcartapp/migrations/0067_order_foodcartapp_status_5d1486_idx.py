@@ -0,0 +1,17 @@
+# Generated by Django 3.2 on 2026-10-18 17:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0066_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'registrated_at', 'id'], name='foodcartapp_status_5d1486_idx'),
+        ),
+    ]
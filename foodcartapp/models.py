@@ -1,10 +1,15 @@
+from collections import defaultdict
+
 from django.db import models
-from django.db.models import F, Sum
+from django.db.models import Q, Sum, Value
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 
 from phonenumber_field.modelfields import PhoneNumberField
 
+from .tracing import span
+
 
 class Restaurant(models.Model):
     name = models.CharField(
@@ -76,6 +81,12 @@ class Product(models.Model):
     image = models.ImageField(
         'картинка'
     )
+    image_variants = models.JSONField(
+        'варианты картинки',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     special_status = models.BooleanField(
         'спец.предложение',
         default=False,
@@ -127,28 +138,101 @@ class RestaurantMenuItem(models.Model):
         return f"{self.restaurant.name} - {self.product.name}"
 
 
+class BannerQuerySet(models.QuerySet):
+    def active(self, now=None):
+        now = now or timezone.now()
+        return (
+            self.filter(is_active=True)
+            .filter(Q(active_from__isnull=True) | Q(active_from__lte=now))
+            .filter(Q(active_until__isnull=True) | Q(active_until__gt=now))
+        )
+
+
+class Banner(models.Model):
+    title = models.CharField(
+        'заголовок',
+        max_length=50,
+    )
+    image = models.ImageField(
+        'картинка',
+        upload_to='banners',
+    )
+    text = models.CharField(
+        'текст',
+        max_length=200,
+        blank=True,
+    )
+    position = models.PositiveIntegerField(
+        'порядок',
+        default=0,
+        db_index=True,
+    )
+    is_active = models.BooleanField(
+        'показывать',
+        default=True,
+        db_index=True,
+    )
+    active_from = models.DateTimeField(
+        'показывать с',
+        null=True,
+        blank=True,
+        db_index=True,
+    )
+    active_until = models.DateTimeField(
+        'показывать до',
+        null=True,
+        blank=True,
+        db_index=True,
+    )
+
+    objects = BannerQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'баннер'
+        verbose_name_plural = 'баннеры'
+        ordering = ['position', 'id']
+
+    def __str__(self):
+        return self.title
+
+
 class OrderQuerySet(models.QuerySet):
 
-    def with_cost(self):
-        cost_of_order = self.filter(status='OPEN').annotate(cost_of_order=Sum(F('products__cost')))
-        return cost_of_order
+    def with_actual_cost(self):
+        return self.annotate(actual_cost=Coalesce(
+            Sum('products__cost'),
+            Value(0),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2),
+        ))
 
     def get_restaurants_for_order(self):
-        restaurant_menu_items = RestaurantMenuItem.objects.all()
-        all_restaurants = set()
-        for item in restaurant_menu_items:
-            all_restaurants.add(item.restaurant)
-        for order in self:
-            order_restaurants = all_restaurants
-            for product in order.products.all():
-                current_restaurants = set()
-                for restaurant_menu_item in restaurant_menu_items:
-                    if product.product == restaurant_menu_item.product:
-                        current_restaurants.add(restaurant_menu_item.restaurant)
-                order_restaurants = order_restaurants & current_restaurants
-            order.restaurants = order_restaurants
+        with span('orders.get_restaurants_for_order') as match_span:
+            self._match_restaurants()
+            match_span.set(orders=len(self))
         return self
 
+    def _match_restaurants(self):
+        from .availability import menu_availability
+
+        order_items = (
+            OrderItem.objects
+            .filter(order__in=[order.id for order in self])
+            .values_list('order_id', 'product_id')
+        )
+        products_by_order = defaultdict(set)
+        for order_id, product_id in order_items:
+            products_by_order[order_id].add(product_id)
+
+        restaurant_ids_by_order = {
+            order.id: menu_availability.restaurants_for_products(products_by_order[order.id])
+            for order in self
+        }
+        restaurants = Restaurant.objects.in_bulk(set().union(*restaurant_ids_by_order.values()))
+        for order in self:
+            order.restaurants = {
+                restaurants[restaurant_id] for restaurant_id in restaurant_ids_by_order[order.id]
+            }
+
 
 class Order(models.Model):
     OPEN = 'OPEN'
@@ -215,16 +299,32 @@ class Order(models.Model):
         null=True,
         blank=True,
     )
+    total_cost = models.DecimalField(
+        'Стоимость заказа',
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        db_index=True,
+        validators=[MinValueValidator(0)],
+    )
 
     objects = OrderQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Заказ'
         verbose_name_plural = 'Заказы'
+        indexes = [
+            models.Index(fields=['registrated_at', 'id']),
+            models.Index(fields=['status', 'registrated_at', 'id']),
+        ]
 
     def __str__(self):
         return f'{self.firstname} {self.lastname} {self.address}'
 
+    def update_total_cost(self):
+        self.total_cost = self.products.aggregate(total_cost=Sum('cost'))['total_cost'] or 0
+        self.save(update_fields=['total_cost'])
+
 
 class OrderItem(models.Model):
     order = models.ForeignKey(
@@ -0,0 +1,68 @@
+from django.db import connection, transaction
+
+from distance.order_distances import update_order_distances
+from .availability import menu_availability
+from .models import Order, OrderItem
+
+
+BULK_BATCH_SIZE = 500
+
+
+def build_order(order_data):
+    order = Order(
+        firstname=order_data['firstname'],
+        lastname=order_data['lastname'],
+        phonenumber=order_data['phonenumber'],
+        address=order_data['address'],
+    )
+    order_items = [
+        OrderItem(
+            order=order,
+            product=product['product'],
+            quantity=product['quantity'],
+            cost=product['product'].price * product['quantity'],
+        )
+        for product in order_data['products']
+    ]
+    order.total_cost = sum(order_item.cost for order_item in order_items)
+    return order, order_items
+
+
+@transaction.atomic
+def create_orders(orders_data):
+    """Сохранить пачку уже провалидированных заказов за несколько запросов.
+
+    Заказы, позиции и связи с доступными ресторанами вставляются через
+    bulk_create, поэтому сигналы post_save и m2m_changed не срабатывают —
+    расчёт расстояний запускается здесь явно. Он же ставит в очередь
+    геокодирования адреса, которых ещё нет в PlaceCoords.
+    """
+    built_orders = [build_order(order_data) for order_data in orders_data]
+    orders = [order for order, _ in built_orders]
+    if connection.features.can_return_rows_from_bulk_insert:
+        Order.objects.bulk_create(orders, batch_size=BULK_BATCH_SIZE)
+    else:
+        # SQLite в Django 3.2 не возвращает id из bulk_create
+        for order in orders:
+            order.save()
+
+    order_items = []
+    restaurant_links = []
+    RestaurantLink = Order.available_restaurants.through
+    for order, items in built_orders:
+        for order_item in items:
+            order_item.order = order
+        order_items.extend(items)
+        restaurant_ids = menu_availability.restaurants_for_products(
+            {order_item.product_id for order_item in items}
+        )
+        restaurant_links.extend(
+            RestaurantLink(order_id=order.id, restaurant_id=restaurant_id)
+            for restaurant_id in restaurant_ids
+        )
+    OrderItem.objects.bulk_create(order_items, batch_size=BULK_BATCH_SIZE)
+    RestaurantLink.objects.bulk_create(restaurant_links, batch_size=BULK_BATCH_SIZE)
+
+    order_ids = [order.id for order in orders]
+    transaction.on_commit(lambda: update_order_distances(order_ids))
+    return orders
@@ -0,0 +1,132 @@
+import json
+import os
+import traceback
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .models import Product
+
+
+@dataclass(frozen=True)
+class QueryBudget:
+    """Сколько запросов к БД может сделать страница.
+
+    Лимит — base плюс per[размер] × размер для каждого размера данных из
+    sizes и запас headroom: так бюджет для страниц с пагинацией или
+    корзиной растёт вместе с данными, мелкие правки не ломают проверку,
+    а N+1 по товарам или заказам всё равно вылезает за него.
+    """
+
+    name: str
+    method: str
+    path: str
+    base: int
+    per: dict = field(default_factory=dict)
+    payload: object = None
+    headroom: int = 2
+
+    def limit(self, sizes):
+        return self.base + self.headroom + sum(int(rate * sizes[size]) for size, rate in self.per.items())
+
+    def request(self, client, context):
+        if self.method == 'GET':
+            return client.get(self.path)
+        return client.post(self.path, json.dumps(self.payload(context)), content_type='application/json')
+
+
+def make_order(context, number=0):
+    return {
+        'firstname': 'Иван',
+        'lastname': f'Тестов {number}',
+        'phonenumber': '+79123456789',
+        'address': f'Москва, Тверская улица, дом {number + 1}',
+        'products': [
+            {'product': product_id, 'quantity': 1}
+            for product_id in context['product_ids'][:context['sizes']['cart_lines']]
+        ],
+    }
+
+
+def make_orders(context):
+    return [make_order(context, number) for number in range(context['sizes']['bulk_orders'])]
+
+
+QUERY_BUDGETS = [
+    QueryBudget('products_api', 'GET', '/api/products/', base=1),
+    QueryBudget('banners_api', 'GET', '/api/banners/', base=2),
+    QueryBudget('register_order', 'POST', '/api/order/', base=23, payload=make_order),
+    QueryBudget(
+        'register_orders_bulk',
+        'POST',
+        '/api/orders/bulk/',
+        base=17,
+        per={'unbatched_orders': 1},
+        payload=make_orders,
+    ),
+    QueryBudget('manager_orders', 'GET', '/manager/orders/', base=5),
+    QueryBudget('manager_orders_json', 'GET', '/manager/orders.json', base=4),
+    QueryBudget('manager_products', 'GET', '/manager/products/', base=5),
+    QueryBudget('manager_restaurants', 'GET', '/manager/restaurants/', base=3),
+]
+
+
+def make_budget_context(dataset, cart_lines, bulk_orders):
+    # без возврата id из bulk_create заказы пачки сохраняются по одному
+    unbatched_orders = 0 if connection.features.can_return_rows_from_bulk_insert else bulk_orders
+    return {
+        'product_ids': list(Product.objects.available().order_by('id').values_list('id', flat=True)),
+        'sizes': {
+            **dataset,
+            'cart_lines': cart_lines,
+            'bulk_orders': bulk_orders,
+            'unbatched_orders': unbatched_orders,
+        },
+    }
+
+
+def measure_budget(budget, client, context):
+    """Выполнить запрос бюджета с холодным кэшем и вернуть ответ и сделанные SQL-запросы.
+
+    Кэш очищается целиком, поэтому вызывать только внутри isolated_caches().
+    """
+    cache.clear()
+    with capture_queries() as queries:
+        response = budget.request(client, context)
+    return response, queries
+
+
+def find_call_site(stack):
+    for frame in reversed(stack):
+        filename = os.path.abspath(frame.filename)
+        if not filename.startswith(settings.BASE_DIR) or 'site-packages' in filename:
+            continue
+        if filename == os.path.abspath(__file__):
+            continue
+        return f'{os.path.relpath(filename, settings.BASE_DIR)}:{frame.lineno} in {frame.name}'
+    return 'вне кода проекта'
+
+
+@contextmanager
+def capture_queries():
+    """Записать SQL каждого запроса вместе с местом в коде проекта, откуда он сделан."""
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        queries.append((sql, find_call_site(traceback.extract_stack()[:-1])))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(record):
+        yield queries
+
+
+def group_by_call_site(queries):
+    counts = Counter(call_site for _, call_site in queries)
+    examples = {}
+    for sql, call_site in queries:
+        examples.setdefault(call_site, sql)
+    return [(call_site, count, examples[call_site]) for call_site, count in counts.most_common()]
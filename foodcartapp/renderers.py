@@ -0,0 +1,45 @@
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from rest_framework import renderers
+from rest_framework.utils.encoders import JSONEncoder as DRFJSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+PRETTY = 'pretty'
+COMPACT = 'compact'
+
+
+def dumps_pretty(data):
+    return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False, indent=4).encode()
+
+
+def dumps_compact(data, encoder=DjangoJSONEncoder):
+    if orjson is not None:
+        return orjson.dumps(data, default=encoder().default)
+    return json.dumps(data, cls=encoder, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def dumps(data):
+    """Сериализовать ответ публичного API в режиме из settings.JSON_RENDERER.
+
+    В компактном режиме используется orjson, если он установлен. Decimal,
+    как и раньше, превращается в строку.
+    """
+    if settings.JSON_RENDERER == COMPACT:
+        return dumps_compact(data)
+    return dumps_pretty(data)
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if settings.JSON_RENDERER != COMPACT or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        return dumps_compact(data, encoder=DRFJSONEncoder)
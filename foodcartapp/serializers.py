@@ -0,0 +1,64 @@
+from rest_framework.serializers import ModelSerializer, PrimaryKeyRelatedField
+
+from .models import Order, OrderItem, Product
+
+
+def collect_product_ids(orders_data):
+    product_ids = set()
+    for order_data in orders_data:
+        if not isinstance(order_data, dict) or not isinstance(order_data.get('products'), list):
+            continue
+        for product in order_data['products']:
+            if not isinstance(product, dict) or isinstance(product.get('product'), bool):
+                continue
+            try:
+                product_ids.add(int(product.get('product')))
+            except (TypeError, ValueError):
+                continue
+    return product_ids
+
+
+def load_products(orders_data):
+    return Product.objects.only('id', 'price').in_bulk(collect_product_ids(orders_data))
+
+
+class ProductField(PrimaryKeyRelatedField):
+    """Товар по id из товаров, заранее загруженных в context['products'].
+
+    Ошибки те же, что у PrimaryKeyRelatedField, но без запроса на каждую позицию.
+    """
+
+    def to_internal_value(self, data):
+        products = self.context.get('products')
+        if products is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            product = products.get(int(data))
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        if product is None:
+            self.fail('does_not_exist', pk_value=data)
+        return product
+
+
+class OrderItemSerializer(ModelSerializer):
+    product = ProductField(queryset=Product.objects.all())
+
+    class Meta:
+        model = OrderItem
+        fields = ['product', 'quantity']
+
+
+class OrderSerializer(ModelSerializer):
+    products = OrderItemSerializer(many=True, allow_empty=False)
+
+    class Meta:
+        model = Order
+        fields = ['id', 'products', 'firstname', 'lastname', 'phonenumber', 'address']
+
+    def to_internal_value(self, data):
+        if 'products' not in self.context:
+            self.context['products'] = load_products([data])
+        return super().to_internal_value(data)
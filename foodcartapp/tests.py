@@ -0,0 +1,259 @@
+import asyncio
+import io
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+
+from rest_framework.serializers import ModelSerializer
+
+from distance.models import GeocodingJob
+
+from .availability import VERSION_NAME as AVAILABILITY_VERSION
+from .banners import VERSION_NAME as BANNERS_VERSION
+from .benchdata import BenchScale, clear_bench_data, isolated_caches, seed_bench_data
+from .catalog import VERSION_NAME as CATALOG_VERSION
+from .images import serialize_image_variants
+from .models import Banner, Order, OrderItem, Product, Restaurant, RestaurantMenuItem
+from .query_budgets import QUERY_BUDGETS, group_by_call_site, make_budget_context, make_order, measure_budget
+from .serializers import OrderSerializer, load_products
+from .tracing import TracingMiddleware
+from .versions import get_version
+
+
+@isolated_caches()
+class QueryBudgetTest(TransactionTestCase):
+    # заказы регистрируются в on_commit, поэтому нужны настоящие транзакции
+    scales = (1, 2)
+
+    def setUp(self):
+        manager = get_user_model().objects.create_user('budget', is_staff=True)
+        self.client.force_login(manager)
+
+    def seed(self, factor):
+        clear_bench_data()
+        dataset = seed_bench_data(BenchScale().scaled(factor))
+        return make_budget_context(dataset, cart_lines=5, bulk_orders=20)
+
+    def test_pages_fit_query_budgets(self):
+        for factor in self.scales:
+            context = self.seed(factor)
+            for budget in QUERY_BUDGETS:
+                with self.subTest(budget=budget.name, scale=factor):
+                    response, queries = measure_budget(budget, self.client, context)
+                    self.assertEqual(response.status_code, 200)
+                    report = '\n'.join(
+                        f'{count} × {call_site}: {sql[:200]}'
+                        for call_site, count, sql in group_by_call_site(queries)
+                    )
+                    self.assertLessEqual(len(queries), budget.limit(context['sizes']), report)
+
+    def test_order_address_is_enqueued_once(self):
+        context = self.seed(1)
+        budget = next(budget for budget in QUERY_BUDGETS if budget.name == 'register_order')
+        _, queries = measure_budget(budget, self.client, context)
+
+        job_inserts = [sql for sql, _ in queries if 'INSERT' in sql and 'distance_geocodingjob' in sql]
+        self.assertEqual(len(job_inserts), 1)
+        self.assertEqual(
+            list(GeocodingJob.objects.values_list('address', flat=True)),
+            [make_order(context)['address']],
+        )
+
+
+class StockOrderItemSerializer(ModelSerializer):
+    class Meta:
+        model = OrderItem
+        fields = ['product', 'quantity']
+
+
+class StockOrderSerializer(ModelSerializer):
+    """Сериализатор заказа, каким он был до загрузки товаров одним запросом."""
+
+    products = StockOrderItemSerializer(many=True, allow_empty=False)
+
+    class Meta:
+        model = Order
+        fields = ['id', 'products', 'firstname', 'lastname', 'phonenumber', 'address']
+
+
+class OrderSerializerCompatibilityTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Чизбургер', price=100)
+
+    def make_payload(self, **changes):
+        payload = {
+            'firstname': 'Иван',
+            'lastname': 'Тестов',
+            'phonenumber': '+79123456789',
+            'address': 'Москва, Тверская улица, 1',
+            'products': [{'product': self.product.id, 'quantity': 2}],
+        }
+        payload.update(changes)
+        return payload
+
+    def invalid_payloads(self):
+        line = {'product': self.product.id, 'quantity': 1}
+        return [
+            self.make_payload(products=[{'product': 999999, 'quantity': 1}]),
+            self.make_payload(products=[{'product': 'abc', 'quantity': 1}]),
+            self.make_payload(products=[{'product': True, 'quantity': 1}]),
+            self.make_payload(products=[{'product': None, 'quantity': 1}]),
+            self.make_payload(products=[{'product': {'id': 1}, 'quantity': 1}]),
+            self.make_payload(products=[{'quantity': 1}]),
+            self.make_payload(products=[line, {'product': 999999, 'quantity': 'много'}]),
+            self.make_payload(products=[]),
+            self.make_payload(products=None),
+            self.make_payload(products='Чизбургер'),
+            self.make_payload(products=['Чизбургер']),
+            self.make_payload(phonenumber='123'),
+            self.make_payload(firstname=None, address=''),
+            {},
+            ['Чизбургер'],
+        ]
+
+    def test_errors_match_stock_serializer(self):
+        for payload in self.invalid_payloads():
+            with self.subTest(payload=payload):
+                serializer = OrderSerializer(data=payload)
+                stock_serializer = StockOrderSerializer(data=payload)
+                self.assertFalse(serializer.is_valid())
+                self.assertFalse(stock_serializer.is_valid())
+                self.assertEqual(serializer.errors, stock_serializer.errors)
+
+    def test_errors_match_with_preloaded_products(self):
+        payloads = self.invalid_payloads()
+        products = load_products(payloads)
+        for payload in payloads:
+            with self.subTest(payload=payload):
+                serializer = OrderSerializer(data=payload, context={'products': products})
+                stock_serializer = StockOrderSerializer(data=payload)
+                self.assertFalse(serializer.is_valid())
+                stock_serializer.is_valid()
+                self.assertEqual(serializer.errors, stock_serializer.errors)
+
+    def test_endpoint_returns_stock_errors(self):
+        payload = self.make_payload(products=[{'product': 999999, 'quantity': 1}])
+        response = self.client.post('/api/order/', json.dumps(payload), content_type='application/json')
+        stock_serializer = StockOrderSerializer(data=payload)
+        stock_serializer.is_valid()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), json.loads(json.dumps(stock_serializer.errors)))
+
+    def test_valid_payload_resolves_products_in_one_query(self):
+        payload = self.make_payload(products=[{'product': self.product.id, 'quantity': 1}] * 20)
+        serializer = OrderSerializer(data=payload)
+        with self.assertNumQueries(1):
+            self.assertTrue(serializer.is_valid())
+        self.assertEqual(serializer.validated_data['products'][0]['product'], self.product)
+
+
+class CacheInvalidationTest(TestCase):
+    def setUp(self):
+        self.product = Product.objects.create(name='Чизбургер', price=100)
+        self.restaurant = Restaurant.objects.create(name='Бургерная', address='Москва, Арбат, 2')
+
+    def assert_bumped_on_commit(self, version_name, change):
+        version = get_version(version_name)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+            self.assertEqual(get_version(version_name), version)
+        self.assertNotEqual(get_version(version_name), version)
+
+    def test_menu_availability(self):
+        self.assert_bumped_on_commit(
+            AVAILABILITY_VERSION,
+            lambda: RestaurantMenuItem.objects.create(restaurant=self.restaurant, product=self.product),
+        )
+
+    def test_catalog(self):
+        self.assert_bumped_on_commit(
+            CATALOG_VERSION,
+            lambda: self.product.save(),
+        )
+
+    def test_banners(self):
+        self.assert_bumped_on_commit(
+            BANNERS_VERSION,
+            lambda: Banner.objects.create(title='Скидки', image='banners/sale.png'),
+        )
+
+
+class TracingMiddlewareTest(SimpleTestCase):
+    def test_async_chain_stays_async(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        middleware = TracingMiddleware(get_response)
+        self.assertTrue(asyncio.iscoroutinefunction(middleware))
+        response = asyncio.run(middleware(RequestFactory().get('/')))
+        self.assertEqual(response.status_code, 200)
+
+    def test_sync_chain_stays_sync(self):
+        middleware = TracingMiddleware(lambda request: HttpResponse())
+        self.assertFalse(asyncio.iscoroutinefunction(middleware))
+        self.assertEqual(middleware(RequestFactory().get('/')).status_code, 200)
+
+
+def make_image(width=400, height=300):
+    output = io.BytesIO()
+    Image.new('RGB', (width, height), 'orange').save(output, format='PNG')
+    return ContentFile(output.getvalue())
+
+
+class ProductImageVariantsTest(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, PRODUCT_IMAGE_WIDTHS=[160])
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def save_image(self, product, name, content):
+        product.image.save(name, content, save=False)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        product.refresh_from_db()
+
+    def test_variants_are_generated_after_commit(self):
+        product = Product(name='Чизбургер', price=100)
+        product.image.save('burger.png', make_image(), save=False)
+        with self.captureOnCommitCallbacks() as callbacks:
+            product.save()
+        self.assertEqual(product.image_variants, {})
+        self.assertEqual(serialize_image_variants(product), {})
+
+        callbacks[0]()
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants['source'], product.image.name)
+        self.assertTrue(default_storage.exists(product.image_variants['jpeg']['160']))
+
+    def test_old_variants_are_deleted(self):
+        product = Product(name='Чизбургер', price=100)
+        self.save_image(product, 'burger.png', make_image())
+        old_variant = product.image_variants['jpeg']['160']
+
+        self.save_image(product, 'burger-new.png', make_image())
+        self.assertFalse(default_storage.exists(old_variant))
+        self.assertTrue(default_storage.exists(product.image_variants['jpeg']['160']))
+
+    def test_broken_upload_keeps_product(self):
+        product = Product(name='Чизбургер', price=100)
+        with self.assertLogs('foodcartapp.images', 'WARNING'):
+            self.save_image(product, 'broken.png', ContentFile(b'not an image'))
+        self.assertEqual(product.image_variants, {})
+
+    def test_decompression_bomb_keeps_product(self):
+        product = Product(name='Чизбургер', price=100)
+        with mock.patch.object(Image, 'MAX_IMAGE_PIXELS', 1000), self.assertLogs('foodcartapp.images', 'WARNING'):
+            self.save_image(product, 'huge.png', make_image())
+        self.assertEqual(product.image_variants, {})
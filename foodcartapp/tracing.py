@@ -0,0 +1,153 @@
+import json
+import logging
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from threading import Lock
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+_current_span = ContextVar('current_span', default=None)
+
+
+class Span:
+    def __init__(self, name, attributes, parent=None):
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.children = []
+        self.error = None
+        self.started_at = time.time()
+        self._started = time.perf_counter()
+        self.duration = None
+        if parent is not None:
+            parent.children.append(self)
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        self.duration = time.perf_counter() - self._started
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'started_at': self.started_at,
+            'duration_ms': round(self.duration * 1000, 3),
+            'attributes': self.attributes,
+            'error': self.error,
+            'children': [child.as_dict() for child in self.children],
+        }
+
+
+class TraceBuffer:
+    def __init__(self):
+        self._lock = Lock()
+        self._traces = deque(maxlen=settings.TRACING_BUFFER_SIZE)
+
+    def append(self, trace):
+        with self._lock:
+            self._traces.append(trace)
+
+    def all(self):
+        with self._lock:
+            return list(reversed(self._traces))
+
+
+trace_buffer = TraceBuffer()
+
+
+def current_span():
+    return _current_span.get()
+
+
+@contextmanager
+def span(name, **attributes):
+    """Замерить участок кода как вложенный span текущей трассы.
+
+    Span без родителя начинает новую трассу. Трасса целиком попадает в лог
+    и в буфер для /manager/traces/, если она длилась дольше
+    TRACING_SLOW_THRESHOLD или попала в случайную выборку TRACING_SAMPLE_RATE.
+    """
+    if not settings.TRACING_ENABLED:
+        yield Span(name, attributes)
+        return
+
+    parent = _current_span.get()
+    current = Span(name, attributes, parent)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except Exception as error:
+        current.error = type(error).__name__
+        raise
+    finally:
+        current.finish()
+        _current_span.reset(token)
+        if parent is None:
+            finish_trace(current)
+
+
+def traced(name):
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def finish_trace(root):
+    slow = root.duration >= settings.TRACING_SLOW_THRESHOLD
+    if not slow and random.random() >= settings.TRACING_SAMPLE_RATE:
+        return
+    trace = {'trace_id': root.trace_id, 'slow': slow, **root.as_dict()}
+    trace_buffer.append(trace)
+    logger.info('trace %s', json.dumps(trace, ensure_ascii=False, default=str))
+
+
+class TracingMiddleware:
+    """Открывает корневой span на каждый запрос, вложенные spans цепляются к нему."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            # так Django увидит, что __call__ вернёт корутину, и не станет
+            # прогонять ASGI-запросы через единственный поток для синхронного кода
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        with span('request', method=request.method) as request_span:
+            response = self.get_response(request)
+            self.finish_request_span(request_span, request, response)
+        return response
+
+    async def __acall__(self, request):
+        with span('request', method=request.method) as request_span:
+            response = await self.get_response(request)
+            self.finish_request_span(request_span, request, response)
+        return response
+
+    @staticmethod
+    def finish_request_span(request_span, request, response):
+        resolver_match = request.resolver_match
+        request_span.set(
+            route=resolver_match.route if resolver_match else 'unmatched',
+            status=response.status_code,
+        )
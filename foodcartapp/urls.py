@@ -1,12 +1,15 @@
+from django.conf import settings
 from django.urls import path
 
-from .views import product_list_api, banners_list_api, register_order
+from .views import product_list_api, banners_list_api, register_order, register_orders_bulk
+from .views import product_list_api_async, banners_list_api_async
 
 
 app_name = "foodcartapp"
 
 urlpatterns = [
-    path('products/', product_list_api),
-    path('banners/', banners_list_api),
+    path('products/', product_list_api_async if settings.ASYNC_VIEWS else product_list_api),
+    path('banners/', banners_list_api_async if settings.ASYNC_VIEWS else banners_list_api),
     path('order/', register_order),
+    path('orders/bulk/', register_orders_bulk),
 ]
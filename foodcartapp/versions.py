@@ -0,0 +1,13 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+
+
+def get_version(name):
+    return cache.get_or_set(f'version:{name}', uuid4().hex, timeout=None)
+
+
+def bump_version(name):
+    version = uuid4().hex
+    cache.set(f'version:{name}', version, timeout=None)
+    return version
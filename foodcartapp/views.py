@@ -1,119 +1,119 @@
-import math
-
-from geopy import distance as geopy_distance
+from asgiref.sync import sync_to_async
 
+from django.conf import settings
 from django.db import transaction
-from django.http import JsonResponse
-from django.templatetags.static import static
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
 
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from rest_framework.serializers import ModelSerializer
 
-from restaurateur.views import get_coords
-from .models import OrderItem, Product, Order, RestaurantMenuItem
+from .banners import get_banners_snapshot
+from .catalog import get_catalog_snapshot
+from .models import OrderItem, Order
+from .orders import build_order, create_orders
+from .serializers import OrderSerializer, load_products
+from .tracing import span
+
+
+def make_banners_response(request, snapshot):
+    response = get_conditional_response(request, etag=snapshot.etag)
+    if response is None:
+        response = HttpResponse(snapshot.body, content_type='application/json')
+    response['ETag'] = snapshot.etag
+    patch_cache_control(response, public=True, max_age=settings.BANNERS_MAX_AGE)
+    return response
+
+
+def make_products_response(request, snapshot):
+    response = get_conditional_response(
+        request,
+        etag=snapshot.etag,
+        last_modified=snapshot.last_modified,
+    )
+    if response is None:
+        response = HttpResponse(snapshot.body, content_type='application/json')
+    response['ETag'] = snapshot.etag
+    response['Last-Modified'] = http_date(snapshot.last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
 
 
 def banners_list_api(request):
-    # FIXME move data to db?
-    return JsonResponse([
-        {
-            'title': 'Burger',
-            'src': static('burger.jpg'),
-            'text': 'Tasty Burger at your door step',
-        },
-        {
-            'title': 'Spices',
-            'src': static('food.jpg'),
-            'text': 'All Cuisines',
-        },
-        {
-            'title': 'New York',
-            'src': static('tasty.jpg'),
-            'text': 'Food is incomplete without a tasty dessert',
-        }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+    return make_banners_response(request, get_banners_snapshot())
 
 
 def product_list_api(request):
-    products = []
-    for product in Product.objects.all().select_related('category'):
-        if product.menu_items:
-            products.append(product)
-
-    dumped_products = []
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            },
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
-            }
-        }
-        dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
-
-
-class OrderItemSerializer(ModelSerializer):
-
-    class Meta:
-        model = OrderItem
-        fields = ['product', 'quantity']
-
-
-class OrderSerializer(ModelSerializer):
-    products = OrderItemSerializer(many=True, allow_empty=False)
-
-    class Meta:
-        model = Order
-        fields = ['id', 'products', 'firstname', 'lastname', 'phonenumber', 'address']
+    return make_products_response(request, get_catalog_snapshot())
+
+
+async def banners_list_api_async(request):
+    snapshot = await sync_to_async(get_banners_snapshot)()
+    return make_banners_response(request, snapshot)
+
+
+async def product_list_api_async(request):
+    snapshot = await sync_to_async(get_catalog_snapshot)()
+    return make_products_response(request, snapshot)
 
 
 @transaction.atomic
 @api_view(['POST'])
 def register_order(request):
-    serializer = OrderSerializer(data=request.data)
-    serializer.is_valid(raise_exception=True)
-
-    order = Order.objects.create(
-        firstname=serializer.validated_data['firstname'],
-        lastname=serializer.validated_data['lastname'],
-        phonenumber=serializer.validated_data['phonenumber'],
-        address=serializer.validated_data['address'],
-    )
+    with span('register_order.validate'):
+        serializer = OrderSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+    with span('register_order.save') as save_span:
+        order, order_items = build_order(serializer.validated_data)
+        order.save()
+        OrderItem.objects.bulk_create(order_items)
+        save_span.set(order_id=order.id, items=len(order_items))
 
-    order_items = []
-    for product in serializer.validated_data['products']:
-        order_item_data = {
-            'order': order,
-            'product': product['product'],
-            'quantity': product['quantity'],
-            'cost': product['product'].price * product['quantity'],
-        }
-        order_item = OrderItem(**order_item_data)
-        order_items.append(order_item)
-
-    OrderItem.objects.bulk_create(order_items)
-    restaurants = Order.objects.filter(id=order.id).get_restaurants_for_order()[0].restaurants
-    order.available_restaurants.add(*restaurants)
-    order.save()
+    with span('register_order.match'):
+        restaurants = Order.objects.filter(id=order.id).get_restaurants_for_order()[0].restaurants
+        order.available_restaurants.add(*restaurants)
 
     serializer = OrderSerializer(order)
 
     return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+def register_orders_bulk(request):
+    if not isinstance(request.data, list):
+        return Response(
+            {'non_field_errors': ['Ожидался список заказов.']},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    if len(request.data) > settings.BULK_ORDERS_MAX_SIZE:
+        return Response(
+            {'non_field_errors': [f'Не больше {settings.BULK_ORDERS_MAX_SIZE} заказов за раз.']},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    results = []
+    valid_orders = []
+    with span('register_orders_bulk.validate', orders=len(request.data)) as validate_span:
+        products = load_products(request.data)
+        for index, order_data in enumerate(request.data):
+            serializer = OrderSerializer(data=order_data, context={'products': products})
+            if serializer.is_valid():
+                valid_orders.append((index, serializer.validated_data))
+            else:
+                results.append({'index': index, 'status': 'error', 'errors': serializer.errors})
+        validate_span.set(invalid=len(results))
+
+    with span('register_orders_bulk.save', orders=len(valid_orders)):
+        orders = create_orders([order_data for _, order_data in valid_orders])
+    for (index, _), order in zip(valid_orders, orders):
+        results.append({'index': index, 'status': 'created', 'id': order.id})
+    results.sort(key=lambda result: result['index'])
+
+    return Response({
+        'created': len(orders),
+        'failed': len(results) - len(orders),
+        'orders': results,
+    }, status=status.HTTP_200_OK)
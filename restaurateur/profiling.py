@@ -0,0 +1,152 @@
+import logging
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import slugify
+
+from .views import is_manager
+
+
+logger = logging.getLogger(__name__)
+
+PROFILING_MODES = {
+    '1': 'return',
+    'return': 'return',
+    'store': 'store',
+}
+
+
+class SamplingProfiler:
+    """Раз в interval секунд снимает стек потока, в котором создан профилировщик.
+
+    Накопленные стеки отдаются в folded-формате, который понимают
+    flamegraph.pl, speedscope и inferno.
+    """
+
+    def __init__(self, interval, max_duration):
+        self.interval = interval
+        self.max_duration = max_duration
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.root = None
+        self.started_at = None
+        self.duration = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, name='sampling-profiler', daemon=True)
+
+    def start(self, root=None):
+        self.root = root
+        self.started_at = time.perf_counter()
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.duration = time.perf_counter() - self.started_at
+
+    def _sample(self):
+        deadline = time.monotonic() + self.max_duration
+        while not self._stop.wait(self.interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[self._fold(frame)] += 1
+
+    def _fold(self, frame):
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            filename = os.path.relpath(code.co_filename, settings.BASE_DIR)
+            if filename.startswith('..'):
+                filename = os.path.basename(code.co_filename)
+            names.append(f'{code.co_name} ({filename}:{code.co_firstlineno})')
+            if frame is self.root:
+                break
+            frame = frame.f_back
+        return ';'.join(reversed(names))
+
+    def report(self):
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common())
+
+
+def save_report(profiler, request):
+    os.makedirs(settings.PROFILING_DIR, exist_ok=True)
+    route = request.resolver_match.view_name if request.resolver_match else 'unmatched'
+    filename = '{}-{}-{}.folded'.format(
+        timezone.now().strftime('%Y%m%dT%H%M%S%f'),
+        slugify(route.replace(':', '-')),
+        os.getpid(),
+    )
+    with open(os.path.join(settings.PROFILING_DIR, filename), 'w') as report_file:
+        report_file.write(profiler.report())
+
+    reports = sorted(
+        (entry for entry in os.scandir(settings.PROFILING_DIR) if entry.name.endswith('.folded')),
+        key=lambda entry: entry.stat().st_mtime,
+    )
+    for entry in reports[:-settings.PROFILING_MAX_REPORTS]:
+        try:
+            os.remove(entry.path)
+        except FileNotFoundError:
+            pass
+    return filename
+
+
+class ProfilingMiddleware(MiddlewareMixin):
+    """Профилирует запрос сотрудника по ?profile=1 или заголовку X-Profile.
+
+    С ?profile=1 вместо страницы вернётся отчёт, с ?profile=store отчёт
+    сохранится в PROFILING_DIR. Кроме того, каждый PROFILING_SAMPLE_RATE-й
+    в среднем запрос к PROFILING_ROUTES профилируется и сохраняется на диск.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        mode = PROFILING_MODES.get(request.GET.get('profile') or request.headers.get('X-Profile'))
+        if mode and is_manager(request.user):
+            if mode == 'store' and not settings.PROFILING_DIR:
+                # иначе отчёт собрали бы и молча выбросили
+                logger.warning('PROFILING_DIR не задан, отчёт профилировщика вернётся вместо страницы')
+                mode = 'return'
+            request._profiling_mode = mode
+        elif self.should_sample(request):
+            request._profiling_mode = 'sample'
+        else:
+            return None
+
+        request._profiler = SamplingProfiler(settings.PROFILING_INTERVAL, settings.PROFILING_MAX_DURATION)
+        # стеки считаются от BaseHandler._get_response, который вызывает view
+        request._profiler.start(root=sys._getframe(1))
+        return None
+
+    @staticmethod
+    def should_sample(request):
+        if not settings.PROFILING_SAMPLE_RATE or not settings.PROFILING_DIR:
+            return False
+        if request.resolver_match.view_name not in settings.PROFILING_ROUTES:
+            return False
+        return random.randrange(settings.PROFILING_SAMPLE_RATE) == 0
+
+    def process_response(self, request, response):
+        profiler = getattr(request, '_profiler', None)
+        if profiler is None:
+            return response
+        profiler.stop()
+
+        if request._profiling_mode == 'sample':
+            save_report(profiler, request)
+            return response
+
+        if request._profiling_mode == 'return':
+            response = HttpResponse(profiler.report(), content_type='text/plain; charset=utf-8')
+        else:
+            response['X-Profile-Report'] = save_report(profiler, request)
+        response['X-Profile-Samples'] = sum(profiler.stacks.values())
+        response['X-Profile-Duration'] = f'{profiler.duration:.3f}'
+        return response
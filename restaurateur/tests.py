@@ -1,3 +1,96 @@
-from django.test import TestCase
+from datetime import datetime, timedelta, timezone
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from foodcartapp.models import Order
+
+
+@override_settings(ORDERS_PAGE_SIZE=3)
+class OrdersPaginationTest(TestCase):
+    def setUp(self):
+        manager = get_user_model().objects.create_user('manager', is_staff=True)
+        self.client.force_login(manager)
+
+    def create_orders(self, timestamps, status=Order.OPEN):
+        return [
+            Order.objects.create(
+                firstname='Иван',
+                lastname='Тестов',
+                phonenumber='+79123456789',
+                address='Москва, Тверская улица, 1',
+                status=status,
+                registrated_at=registrated_at,
+            )
+            for registrated_at in timestamps
+        ]
+
+    def walk_pages(self, **params):
+        seen_ids = []
+        cursor = None
+        for _ in range(100):
+            response = self.client.get(reverse('restaurateur:view_orders_json'), {**params, 'cursor': cursor or ''})
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            seen_ids.extend(order['id'] for order in page['orders'])
+            cursor = page['next_cursor']
+            if not cursor:
+                return seen_ids
+        self.fail('Пагинация не закончилась')
+
+    def test_walk_has_no_duplicates_or_gaps_on_tied_timestamps(self):
+        moment = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+        timestamps = [moment] * 7 + [moment + timedelta(microseconds=1)] * 2 + [moment - timedelta(days=1)]
+        orders = self.create_orders(timestamps)
+        self.create_orders([moment] * 2, status=Order.CLOSED)
+
+        expected_ids = [order.id for order in sorted(orders, key=lambda order: (order.registrated_at, order.id))]
+        self.assertEqual(self.walk_pages(), expected_ids)
+
+    def test_filters_apply_to_every_page(self):
+        moment = datetime(2026, 1, 1, 12, 0, tzinfo=timezone.utc)
+        self.create_orders([moment] * 2)
+        closed_orders = self.create_orders([moment] * 5, status=Order.CLOSED)
+
+        self.assertEqual(self.walk_pages(status=Order.CLOSED), [order.id for order in closed_orders])
+
+    def test_invalid_cursor_is_rejected(self):
+        for cursor in ['abc', '1.x', '99999999999999999999999.1']:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse('restaurateur:view_orders_json'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('cursor', response.json()['errors'])
+
+    def test_html_page_links_to_next_page(self):
+        self.create_orders([datetime(2026, 1, 1, tzinfo=timezone.utc)] * 4)
+        response = self.client.get(reverse('restaurateur:view_orders'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['order_items']), 3)
+        self.assertIn('cursor=', response.context['next_page_query'])
+
+
+class ProfilingMiddlewareTest(TestCase):
+    def setUp(self):
+        manager = get_user_model().objects.create_user('manager', is_staff=True)
+        self.client.force_login(manager)
+
+    def test_profile_modes(self):
+        url = reverse('restaurateur:RestaurantView')
+        for value, content_type in [
+            ('1', 'text/plain; charset=utf-8'),
+            ('return', 'text/plain; charset=utf-8'),
+            ('0', 'text/html; charset=utf-8'),
+            ('false', 'text/html; charset=utf-8'),
+        ]:
+            with self.subTest(profile=value):
+                response = self.client.get(url, {'profile': value})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response['Content-Type'], content_type)
+
+    @override_settings(PROFILING_DIR='')
+    def test_store_without_profiling_dir_returns_report(self):
+        with self.assertLogs('restaurateur.profiling', 'WARNING'):
+            response = self.client.get(reverse('restaurateur:RestaurantView'), {'profile': 'store'})
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        self.assertNotIn('X-Profile-Report', response)
@@ -14,6 +14,9 @@ urlpatterns = [
 
     # TODO заглушка для нереализованного функционала
     path('orders/', views.view_orders, name="view_orders"),
+    path('orders.json', views.view_orders_json, name="view_orders_json"),
+
+    path('traces/', views.view_traces, name="view_traces"),
 
     path('login/', views.LoginView.as_view(), name="login"),
     path('logout/', views.LogoutView.as_view(), name="logout"),
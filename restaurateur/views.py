@@ -1,26 +1,25 @@
-import requests
-
-from geopy import distance as geopy_distance
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 
 from django import forms
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.shortcuts import redirect, render
 from django.views import View
 from django.urls import reverse_lazy
-from django.utils import timezone
 from django.contrib.auth.decorators import user_passes_test
+from django.db.models import F, Prefetch, Q
 
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
 
+from phonenumber_field.formfields import PhoneNumberField
 
-from foodcartapp.models import Order, Product, Restaurant
-from distance.models import PlaceCoords
-
-from star_burger.settings import YANDEX_APIKEY
 
-
-class GetCoordsError(TypeError):
-    pass
+from foodcartapp import metrics
+from foodcartapp.models import Order, Product, Restaurant, RestaurantMenuItem
+from foodcartapp.tracing import span, trace_buffer
+from distance.models import OrderRestaurantDistance
 
 
 class Login(forms.Form):
@@ -78,7 +77,11 @@ def is_manager(user):
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_products(request):
     restaurants = list(Restaurant.objects.order_by('name'))
-    products = list(Product.objects.prefetch_related('menu_items'))
+    products = list(Product.objects.select_related('category'))
+    menu_items = RestaurantMenuItem.objects.values_list('product_id', 'restaurant_id', 'availability')
+    availability_by_product = defaultdict(dict)
+    for product_id, restaurant_id, availability in menu_items:
+        availability_by_product[product_id][restaurant_id] = availability
 
     default_availability = {restaurant.id: False for restaurant in restaurants}
     products_with_restaurants = []
@@ -86,7 +89,7 @@ def view_products(request):
 
         availability = {
             **default_availability,
-            **{item.restaurant_id: item.availability for item in product.menu_items.all()},
+            **availability_by_product[product.id],
         }
         orderer_availability = [availability[restaurant.id] for restaurant in restaurants]
 
@@ -107,65 +110,172 @@ def view_restaurants(request):
     })
 
 
-def fetch_coordinates(apikey, address):
-    base_url = "https://geocode-maps.yandex.ru/1.x"
-    response = requests.get(base_url, params={
-        "geocode": address,
-        "apikey": apikey,
-        "format": "json",
-    })
-    response.raise_for_status()
-    found_places = response.json()['response']['GeoObjectCollection']['featureMember']
+def encode_orders_cursor(order):
+    registrated_at = order.registrated_at - datetime.fromtimestamp(0, timezone.utc)
+    return f'{registrated_at // timedelta(microseconds=1)}.{order.id}'
 
-    if not found_places:
-        raise GetCoordsError('Некорректный адрес')
 
-    most_relevant = found_places[0]
-    lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
-    return lon, lat
+def decode_orders_cursor(cursor):
+    microseconds, order_id = cursor.split('.')
+    registrated_at = datetime.fromtimestamp(0, timezone.utc) + timedelta(microseconds=int(microseconds))
+    return registrated_at, int(order_id)
 
 
-def get_coords(place_address):
-    try:
-        place_coords = PlaceCoords.objects.get(address=place_address)
-        return place_coords.lon, place_coords.lat
-    except PlaceCoords.DoesNotExist:
+class OrdersFilter(forms.Form):
+    status = forms.ChoiceField(
+        label='Статус',
+        choices=Order.STATUSES,
+        required=False,
+    )
+    payment_method = forms.ChoiceField(
+        label='Способ оплаты',
+        choices=[('', 'Любой'), *Order.PAYMENT_METHODS],
+        required=False,
+    )
+    restaurant = forms.ModelChoiceField(
+        label='Ресторан',
+        queryset=Restaurant.objects.order_by('name'),
+        empty_label='Любой',
+        required=False,
+    )
+    phonenumber = PhoneNumberField(
+        label='Телефон',
+        region='RU',
+        required=False,
+    )
+    cursor = forms.CharField(required=False, widget=forms.HiddenInput)
+
+    def clean_cursor(self):
+        cursor = self.cleaned_data['cursor']
+        if not cursor:
+            return None
         try:
-            place_address_lon, place_address_lat = fetch_coordinates(
-                YANDEX_APIKEY,
-                place_address,
-                )
-            PlaceCoords.objects.create(
-                address=place_address,
-                date_of_calculate_coords=timezone.now(),
-                lon=place_address_lon,
-                lat=place_address_lat,
-                )
-            return place_address_lon, place_address_lat
-        except GetCoordsError:
-            return None, None
+            return decode_orders_cursor(cursor)
+        except (ValueError, OverflowError):
+            raise forms.ValidationError('Некорректная страница')
+
+
+def get_orders_page(filters):
+    restaurant_distances = (
+        OrderRestaurantDistance.objects
+        .select_related('restaurant')
+        .order_by(F('distance').asc(nulls_last=True), 'restaurant__name')
+    )
+    orders = (
+        Order.objects
+        .filter(status=filters.get('status') or Order.OPEN)
+        .order_by('registrated_at', 'id')
+        .prefetch_related(Prefetch('restaurant_distances', queryset=restaurant_distances))
+    )
+    if filters.get('payment_method'):
+        orders = orders.filter(payment_method=filters['payment_method'])
+    if filters.get('restaurant'):
+        orders = orders.filter(restaurant=filters['restaurant'])
+    if filters.get('phonenumber'):
+        orders = orders.filter(phonenumber=filters['phonenumber'])
+    if filters.get('cursor'):
+        registrated_at, order_id = filters['cursor']
+        orders = orders.filter(
+            Q(registrated_at__gt=registrated_at)
+            | Q(registrated_at=registrated_at, id__gt=order_id)
+        )
+
+    orders = list(orders[:settings.ORDERS_PAGE_SIZE + 1])
+    if len(orders) <= settings.ORDERS_PAGE_SIZE:
+        return orders, None
+    orders = orders[:settings.ORDERS_PAGE_SIZE]
+    return orders, encode_orders_cursor(orders[-1])
+
+
+def serialize_order(order):
+    return {
+        'id': order.id,
+        'status': order.status,
+        'payment_method': order.payment_method,
+        'total_cost': order.total_cost,
+        'firstname': order.firstname,
+        'lastname': order.lastname,
+        'phonenumber': str(order.phonenumber),
+        'address': order.address,
+        'comment': order.comment,
+        'registrated_at': order.registrated_at,
+        'restaurant': order.restaurant_id,
+        'restaurants': [
+            {
+                'id': restaurant_distance.restaurant.id,
+                'name': restaurant_distance.restaurant.name,
+                'distance': restaurant_distance.distance,
+            }
+            for restaurant_distance in order.restaurant_distances.all()
+        ],
+    }
 
 
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_orders(request):
-    orders = Order.objects.with_cost().prefetch_related('available_restaurants')
-    for order in orders:
-        order.restaurants_and_distance = []
-        order_address_lon, order_address_lat = get_coords(order.address)
-
-        for restaurant in order.available_restaurants.all():
-            restaurant_lon, restaurant_lat = get_coords(restaurant.address)
-            if order_address_lon and order_address_lat and restaurant_lon and restaurant_lat:
-                distance_between_order_and_restaurant = round(geopy_distance.distance(
-                    (order_address_lat,  order_address_lon),
-                    (restaurant_lat, restaurant_lon)).km)
-            elif not restaurant_lon or not restaurant_lat:
-                distance_between_order_and_restaurant = 'Проверить адрес ресторана!'
-            else:
-                distance_between_order_and_restaurant = 'Проверить адрес заказа!'
-            order.restaurants_and_distance.append((restaurant.name, distance_between_order_and_restaurant))
-        order.restaurants_and_distance = sorted(order.restaurants_and_distance, key=lambda x: x[1])
-
-    return render(request, template_name='order_items.html', context={
-        'order_items': orders,
+    form = OrdersFilter(request.GET)
+    form.is_valid()
+    with span('view_orders.query') as query_span:
+        orders, next_cursor = get_orders_page(form.cleaned_data)
+        query_span.set(orders=len(orders))
+
+    next_page_query = None
+    if next_cursor:
+        next_page_query = request.GET.copy()
+        next_page_query['cursor'] = next_cursor
+        next_page_query = next_page_query.urlencode()
+
+    with span('view_orders.render'):
+        return render(request, template_name='order_items.html', context={
+            'order_items': orders,
+            'filter_form': form,
+            'next_page_query': next_page_query,
+        })
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_orders_json(request):
+    form = OrdersFilter(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    orders, next_cursor = get_orders_page(form.cleaned_data)
+    return JsonResponse({
+        'orders': [serialize_order(order) for order in orders],
+        'next_cursor': next_cursor,
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_metrics(request):
+    counters, histograms = metrics.aggregate(metrics.load_snapshots())
+    return HttpResponse(
+        metrics.render_prometheus(counters, histograms),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
+
+
+def flatten_spans(span_data, depth=0):
+    yield {
+        **span_data,
+        'attributes': sorted(span_data['attributes'].items()),
+        'indent': depth * 20,
+    }
+    for child in span_data['children']:
+        yield from flatten_spans(child, depth + 1)
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_traces(request):
+    traces = [
+        {
+            'trace_id': trace['trace_id'],
+            'slow': trace['slow'],
+            'started_at': datetime.fromtimestamp(trace['started_at'], tz=timezone.utc),
+            'spans': list(flatten_spans(trace)),
+        }
+        for trace in trace_buffer.all()
+    ]
+    return render(request, template_name='traces.html', context={
+        'traces': traces,
+        'slow_threshold_ms': int(settings.TRACING_SLOW_THRESHOLD * 1000),
     })
@@ -12,6 +12,47 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 YANDEX_APIKEY = env('YANDEX_APIKEY')
+YANDEX_GEOCODER_URL = env('YANDEX_GEOCODER_URL', 'https://geocode-maps.yandex.ru/1.x')
+GEOCODER_CONNECT_TIMEOUT = env.float('GEOCODER_CONNECT_TIMEOUT', 3.05)
+GEOCODER_READ_TIMEOUT = env.float('GEOCODER_READ_TIMEOUT', 10)
+GEOCODER_RETRIES = env.int('GEOCODER_RETRIES', 2)
+GEOCODER_BREAKER_THRESHOLD = env.int('GEOCODER_BREAKER_THRESHOLD', 5)
+GEOCODER_BREAKER_COOLDOWN = env.float('GEOCODER_BREAKER_COOLDOWN', 30)
+GEOCODER_WORKER_THREADS = env.int('GEOCODER_WORKER_THREADS', 4)
+GEOCODER_MAX_ATTEMPTS = env.int('GEOCODER_MAX_ATTEMPTS', 5)
+GEOCODER_JOB_BACKOFF = env.float('GEOCODER_JOB_BACKOFF', 30)
+GEOCODER_JOB_MAX_BACKOFF = env.float('GEOCODER_JOB_MAX_BACKOFF', 60 * 60)
+COORDS_TTL_DAYS = env.int('COORDS_TTL_DAYS', 180)
+COORDS_NEGATIVE_TTL_DAYS = env.int('COORDS_NEGATIVE_TTL_DAYS', 7)
+COORDS_REFRESH_POLICY = env('COORDS_REFRESH_POLICY', 'background')
+COORDS_LRU_SIZE = env.int('COORDS_LRU_SIZE', 2048)
+COORDS_LRU_TTL = env.int('COORDS_LRU_TTL', 300)
+COORDS_CACHE_ALIAS = env('COORDS_CACHE_ALIAS', 'default')
+COORDS_CACHE_TTL = env.int('COORDS_CACHE_TTL', 24 * 60 * 60)
+ORDERS_PAGE_SIZE = env.int('ORDERS_PAGE_SIZE', 50)
+CATALOG_CACHE_TTL = env.int('CATALOG_CACHE_TTL', 24 * 60 * 60)
+BANNERS_CACHE_TTL = env.int('BANNERS_CACHE_TTL', 60 * 60)
+BANNERS_MAX_AGE = env.int('BANNERS_MAX_AGE', 60)
+BULK_ORDERS_MAX_SIZE = env.int('BULK_ORDERS_MAX_SIZE', 500)
+PRODUCT_IMAGE_WIDTHS = env.list('PRODUCT_IMAGE_WIDTHS', [160, 320, 640], subcast=int)
+JSON_RENDERER = env('JSON_RENDERER', 'pretty')
+COMPRESSION_MIN_SIZE = env.int('COMPRESSION_MIN_SIZE', 1024)
+COMPRESSION_PATHS = env.list('COMPRESSION_PATHS', ['/api/'])
+BROTLI_QUALITY = env.int('BROTLI_QUALITY', 5)
+ASYNC_VIEWS = env.bool('ASYNC_VIEWS', False)
+METRICS_DIR = env('METRICS_DIR', '')
+METRICS_FLUSH_INTERVAL = env.float('METRICS_FLUSH_INTERVAL', 5)
+PROFILING_DIR = env('PROFILING_DIR', '')
+PROFILING_INTERVAL = env.float('PROFILING_INTERVAL', 0.005)
+PROFILING_MAX_DURATION = env.float('PROFILING_MAX_DURATION', 60)
+PROFILING_SAMPLE_RATE = env.int('PROFILING_SAMPLE_RATE', 0)
+PROFILING_ROUTES = env.list('PROFILING_ROUTES', ['restaurateur:view_orders', 'restaurateur:ProductsView'])
+PROFILING_MAX_REPORTS = env.int('PROFILING_MAX_REPORTS', 100)
+TRACING_ENABLED = env.bool('TRACING_ENABLED', True)
+TRACING_SLOW_THRESHOLD = env.float('TRACING_SLOW_THRESHOLD', 0.5)
+TRACING_SAMPLE_RATE = env.float('TRACING_SAMPLE_RATE', 0)
+TRACING_BUFFER_SIZE = env.int('TRACING_BUFFER_SIZE', 200)
+TRACING_LOG_LEVEL = env('TRACING_LOG_LEVEL', 'INFO')
 SECRET_KEY = env('SECRET_KEY', 'etirgvonenrfnoerngorenogneongg334g')
 DEBUG = env.bool('DEBUG', True)
 
@@ -26,7 +67,6 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'debug_toolbar',
     'phonenumber_field',
     'rest_framework',
     'geopy',
@@ -34,18 +74,42 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodcartapp.middleware.MetricsMiddleware',
+    'foodcartapp.tracing.TracingMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'foodcartapp.middleware.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
+    'restaurateur.profiling.ProfilingMiddleware',
 ]
 
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.append('debug_toolbar.middleware.DebugToolbarMiddleware')
+
 ROOT_URLCONF = 'star_burger.urls'
 
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodcartapp.tracing': {
+            'handlers': ['console'],
+            'level': TRACING_LOG_LEVEL,
+            'propagate': False,
+        },
+    },
+}
+
 DEBUG_TOOLBAR_PANELS = [
     'debug_toolbar.panels.versions.VersionsPanel',
     'debug_toolbar.panels.timer.TimerPanel',
@@ -90,6 +154,17 @@ DATABASES = {
     )
 }
 
+CACHES = {
+    'default': env.dj_cache_url('CACHE_URL', 'locmem://'),
+}
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'foodcartapp.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
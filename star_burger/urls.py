@@ -19,6 +19,8 @@ from django.contrib import admin
 from django.urls import path, include
 from django.shortcuts import render
 
+from restaurateur.views import view_metrics
+
 from . import settings
 
 urlpatterns = [
@@ -26,6 +28,7 @@ urlpatterns = [
     path('', render, kwargs={'template_name': 'index.html'}, name='start_page'),
     path('api/', include('foodcartapp.urls')),
     path('manager/', include('restaurateur.urls')),
+    path('metrics', view_metrics, name='metrics'),
     path('api/order/', include('rest_framework.urls'))
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 